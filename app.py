@@ -1,22 +1,109 @@
 # app.py
-from fastapi import FastAPI, File, UploadFile, HTTPException, Request
+from fastapi import FastAPI, File, UploadFile, HTTPException, Request, Query
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import HTMLResponse, JSONResponse
+from fastapi.responses import HTMLResponse, JSONResponse, Response, FileResponse, PlainTextResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from pydantic import BaseModel
-import uvicorn
+from typing import List, Optional
+from datetime import datetime
 import os
 import uuid
 import shutil
 import json
-import httpx
-from PyPDF2 import PdfReader
-import docx
-import re
+import io
+import math
+import hmac
+import asyncio
+import time
+from urllib.parse import urlsplit
+
+# Referencia para medir el tiempo desde el arranque hasta la primera respuesta
+BOOT_TIME = time.monotonic()
+
+# PyPDF2, httpx, uvicorn, los extractores y el perfilador se importan al usarse
+# por primera vez: cada worker nuevo solo paga al arrancar lo que necesita
+# para servir (ver bench/import_time.py)
+from chunk_store import ChunkStore, DocumentRecord, DocumentCatalog
+from registry import ChatbotRegistry, InvalidCursor
+from ratelimit import RateLimiter, LimitExceeded
+from retrieval import LexicalIndex
+from extractive import extract_answer
+from llm import load_backends
+from conversation import SessionCache, rewrite_query
+from stats import percentile
+from reaper import DocumentReaper
 
 # Configuración
 DEEPSEEK_API_KEY = os.environ.get("DEEPSEEK_API_KEY", "your_deepseek_api_key_here")
-DEEPSEEK_API_URL = "https://api.deepseek.com/v1/chat/completions"
+DEEPSEEK_API_URL = os.environ.get("DEEPSEEK_API_URL", "https://api.deepseek.com/v1/chat/completions")
+
+# Proveedores de generación: "deepseek" y "local" (determinista, sin red) siempre
+# existen; LLM_BACKENDS (JSON) añade o redefine proveedores compatibles con OpenAI
+LLM_PROVIDER = os.environ.get("LLM_PROVIDER", "deepseek")
+LLM_BACKENDS = json.loads(os.environ.get("LLM_BACKENDS", "{}"))
+
+# Perfilado por petición (desactivado por defecto)
+ADMIN_TOKEN = os.environ.get("ADMIN_TOKEN")
+PROFILE_SAMPLE_RATE = float(os.environ.get("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_SAMPLE_MODE = os.environ.get("PROFILE_SAMPLE_MODE", "cprofile")
+PROFILES_DIR = os.environ.get("PROFILES_DIR", "profiles")
+
+# Documentos cargados en memoria a la vez (con su índice léxico); 0 sin límite
+DOCUMENT_CACHE_SIZE = int(os.environ.get("DOCUMENT_CACHE_SIZE", "1000"))
+
+# Índice de valores por columna para documentos CSV
+CSV_COLUMN_INDEX = os.environ.get("CSV_COLUMN_INDEX", "1") == "1"
+
+# Caché del texto extraído de cada página de PDF, por hash de contenido
+PDF_PAGE_CACHE = os.environ.get("PDF_PAGE_CACHE", "1") == "1"
+
+# Límites de peticiones por minuto (0 los desactiva) y cuota diaria de tokens por chatbot
+RATE_LIMIT_PER_CHATBOT = int(os.environ.get("RATE_LIMIT_PER_CHATBOT", "60"))
+RATE_LIMIT_PER_ORIGIN = int(os.environ.get("RATE_LIMIT_PER_ORIGIN", "120"))
+RATE_LIMIT_PER_IP = int(os.environ.get("RATE_LIMIT_PER_IP", "20"))
+DAILY_TOKEN_QUOTA = int(os.environ.get("DAILY_TOKEN_QUOTA", "0"))
+TRUST_PROXY_HEADERS = os.environ.get("TRUST_PROXY_HEADERS", "0") == "1"
+
+# Estado persistente (documentos troceados, chatbots y contadores de uso)
+DATA_DIR = os.environ.get("DATA_DIR", "data")
+USAGE_STATE_FILE = os.environ.get("USAGE_STATE_FILE", os.path.join(DATA_DIR, "usage.json"))
+CHATBOTS_STATE_FILE = os.path.join(DATA_DIR, "chatbots.json")
+UPLOADS_DIR = "uploads"
+STATIC_DIR = "static"
+
+# Precalentamiento al arrancar: cuántos de los chatbots más usados cargar por adelantado
+WARMUP_ENABLED = os.environ.get("WARMUP_ENABLED", "1") == "1"
+WARMUP_CHATBOTS = int(os.environ.get("WARMUP_CHATBOTS", "20"))
+
+# Recolección de documentos sin chatbots: gracia antes de borrar (s), cada
+# cuánto se revisa (s) y cuántos documentos y archivos se borran por pasada
+GC_ENABLED = os.environ.get("GC_ENABLED", "1") == "1"
+GC_GRACE_SECONDS = float(os.environ.get("GC_GRACE_SECONDS", "86400"))
+GC_INTERVAL = float(os.environ.get("GC_INTERVAL", "300"))
+GC_BATCH_SIZE = int(os.environ.get("GC_BATCH_SIZE", "100"))
+
+# Límites de la caché de páginas de PDF: tamaño total (MB) y días sin usarse
+PDF_PAGE_CACHE_DIR = os.path.join(DATA_DIR, "pdf_pages")
+PDF_PAGE_CACHE_MAX_MB = float(os.environ.get("PDF_PAGE_CACHE_MAX_MB", "256"))
+PDF_PAGE_CACHE_MAX_AGE_DAYS = float(os.environ.get("PDF_PAGE_CACHE_MAX_AGE_DAYS", "30"))
+
+# Preguntas en lote (solo administración): tamaño máximo, preguntas por minuto
+# por chatbot (0 sin límite) y llamadas simultáneas al proveedor por lote
+BATCH_MAX_QUESTIONS = int(os.environ.get("BATCH_MAX_QUESTIONS", "1000"))
+BATCH_RATE_LIMIT = int(os.environ.get("BATCH_RATE_LIMIT", "2000"))
+BATCH_CONCURRENCY = int(os.environ.get("BATCH_CONCURRENCY", "8"))
+BATCH_MAX_CONCURRENCY = int(os.environ.get("BATCH_MAX_CONCURRENCY", "32"))
+
+# Respuestas extractivas locales (valores por defecto; cada chatbot puede cambiarlos)
+FAST_PATH_ENABLED = os.environ.get("FAST_PATH_ENABLED", "0") == "1"
+FAST_PATH_THRESHOLD = float(os.environ.get("FAST_PATH_THRESHOLD", "0.8"))
+
+# Conversaciones: consulta reescrita con el historial y reutilización de los
+# chunks del turno anterior si cubren esta parte del IDF de la consulta
+QUERY_REWRITE_ENABLED = os.environ.get("QUERY_REWRITE_ENABLED", "1") == "1"
+SESSION_CACHE_SIZE = int(os.environ.get("SESSION_CACHE_SIZE", "10000"))
+SESSION_TTL = float(os.environ.get("SESSION_TTL", "1800"))
+SESSION_REUSE_COVERAGE = float(os.environ.get("SESSION_REUSE_COVERAGE", "0.9"))
 
 app = FastAPI(title="Chatbot de Documentos Inteligente")
 
@@ -27,26 +114,82 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "X-Total-Count"],
 )
 
-# Crear directorios necesarios
-os.makedirs("uploads", exist_ok=True)
-os.makedirs("static", exist_ok=True)
-os.makedirs("static/css", exist_ok=True)
-os.makedirs("static/js", exist_ok=True)
+# Perfilado opcional de las rutas costosas (sin token ni muestreo no se instala)
+profile_store = None
+if ADMIN_TOKEN or PROFILE_SAMPLE_RATE > 0:
+    from profiling import ProfileStore, ProfilingMiddleware
+    profile_store = ProfileStore(PROFILES_DIR)
+    app.add_middleware(
+        ProfilingMiddleware,
+        store=profile_store,
+        paths=["/api/ask-question/", "/api/upload-document/"],
+        admin_token=ADMIN_TOKEN,
+        sample_rate=PROFILE_SAMPLE_RATE,
+        sample_mode=PROFILE_SAMPLE_MODE,
+    )
+
+# Servir archivos estáticos; el directorio se crea al arrancar, no al importar
+app.mount("/static", StaticFiles(directory=STATIC_DIR, check_dir=False), name="static")
 
-# Servir archivos estáticos
-app.mount("/static", StaticFiles(directory="static"), name="static")
+# Documentos (en disco, cargados con mmap bajo demanda) y configuraciones de chatbots
+documents = DocumentCatalog(os.path.join(DATA_DIR, "documents"), max_loaded=DOCUMENT_CACHE_SIZE)
+chatbots = ChatbotRegistry()
+reaper = DocumentReaper(
+    documents, chatbots, UPLOADS_DIR, grace_period=GC_GRACE_SECONDS, batch_size=GC_BATCH_SIZE,
+    page_cache_dir=PDF_PAGE_CACHE_DIR,
+    page_cache_max_bytes=int(PDF_PAGE_CACHE_MAX_MB * 1024 * 1024),
+    page_cache_max_age=PDF_PAGE_CACHE_MAX_AGE_DAYS * 86400
+)
+
+# Contadores de uso y límites por chatbot, origen, IP y de los lotes
+limiter = RateLimiter(
+    {"chatbot": RATE_LIMIT_PER_CHATBOT, "origin": RATE_LIMIT_PER_ORIGIN, "ip": RATE_LIMIT_PER_IP,
+     "batch": BATCH_RATE_LIMIT},
+    daily_token_quota=DAILY_TOKEN_QUOTA,
+    state_file=USAGE_STATE_FILE
+)
 
-# Almacenamiento en memoria para documentos y configuraciones de chatbots
-documents = {}
-chatbots = {}
+# Contadores del servicio, expuestos en /api/metrics
+metrics = {
+    "questions": 0,
+    "upstream_calls": 0,
+    "upstream_errors": 0,
+    "fast_path_checks": 0,
+    "fast_path_hits": 0,
+    "fast_path_ms": 0.0,
+    "queries_rewritten": 0,
+    "session_lookups": 0,
+    "session_reuses": 0,
+    "documents_ingested": 0,
+    "ingest_ms": 0.0,
+    "pdf": {
+        "pages": 0,
+        "text_pages": 0,
+        "image_pages": 0,
+        "empty_pages": 0,
+        "cache_hits": 0,
+        "pages_extracted": 0,
+        "prescan_ms": 0.0,
+        "extract_ms": 0.0
+    }
+}
 
 # Modelos de datos
 class Question(BaseModel):
     question: str
     document_id: str
     chat_history: list = []
+    chatbot_id: Optional[str] = None
+    session_id: Optional[str] = None
+
+class BatchQuestions(BaseModel):
+    questions: List[str]
+    document_id: str
+    chatbot_id: Optional[str] = None
+    concurrency: Optional[int] = None
 
 class ChatbotConfig(BaseModel):
     name: str
@@ -55,66 +198,187 @@ class ChatbotConfig(BaseModel):
     bubble_icon: str = "chat"
     welcome_message: str = "Hola, ¿en qué puedo ayudarte sobre este documento?"
     placeholder_text: str = "Escribe tu pregunta aquí..."
+    owner_id: Optional[str] = None
+    daily_token_quota: Optional[int] = None
+    fast_path: Optional[bool] = None
+    fast_path_threshold: Optional[float] = None
+    provider: Optional[str] = None
+    model: Optional[str] = None
 
 # Extraer texto de diferentes tipos de documentos
-def extract_text(file_path):
+def extract_text(file_path, stats=None):
     _, extension = os.path.splitext(file_path)
     
     if extension.lower() == '.pdf':
-        text = ""
-        with open(file_path, 'rb') as f:
-            pdf = PdfReader(f)
-            for page in pdf.pages:
-                page_text = page.extract_text()
-                if page_text:
-                    text += page_text + "\n"
-        return text
+        # Sin extract_text para páginas escaneadas y sin repetir páginas ya vistas
+        from extractors.pdf_pages import extract_pdf_text
+        return extract_pdf_text(file_path, cache=get_pdf_cache(), stats=stats)
     
     elif extension.lower() == '.docx':
-        doc = docx.Document(file_path)
-        return "\n".join([paragraph.text for paragraph in doc.paragraphs if paragraph.text])
+        # Párrafos y filas de tablas en orden, leídos en streaming del zip
+        from extractors.docx_stream import extract_docx_text
+        return extract_docx_text(file_path)
     
-    elif extension.lower() in ['.txt', '.csv', '.md']:
+    elif extension.lower() == '.csv':
+        from extractors.csv_rows import extract_csv_text
+        return extract_csv_text(file_path)
+    
+    elif extension.lower() in ['.txt', '.md']:
         with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
             return f.read()
     
     else:
         raise ValueError(f"Formato de archivo no soportado: {extension}")
 
+# Caché de páginas de PDF compartida entre subidas (se crea en el primer PDF)
+pdf_cache = None
+
+def get_pdf_cache():
+    global pdf_cache
+    if pdf_cache is None and PDF_PAGE_CACHE:
+        from extractors.pdf_pages import PageTextCache
+        pdf_cache = PageTextCache(PDF_PAGE_CACHE_DIR)
+    return pdf_cache
+
 # Procesar texto para chunking y mejor procesamiento
 def process_text(text):
-    # Eliminar espacios en blanco excesivos y líneas vacías
-    text = re.sub(r'\n\s*\n', '\n\n', text)
-    text = re.sub(r'\s+', ' ', text)
-    return text.strip()
-
-# Chunking del texto para procesamiento eficiente
-def chunk_text(text, chunk_size=1000, overlap=100):
-    processed_text = process_text(text)
-    chunks = []
+    # Colapsar todos los espacios en blanco en una sola pasada
+    return " ".join(text.split())
+
+# Ingerir un documento: chunks listos para consultar en un almacenamiento compacto
+def ingest_document(file_path, stats=None):
+    _, extension = os.path.splitext(file_path)
     
-    if len(processed_text) <= chunk_size:
-        chunks.append(processed_text)
-    else:
-        start = 0
-        while start < len(processed_text):
-            end = min(start + chunk_size, len(processed_text))
-            
-            # Ajustar final para no cortar en medio de una palabra
-            if end < len(processed_text):
-                while end > start and processed_text[end] != ' ':
-                    end -= 1
-            
-            chunks.append(processed_text[start:end])
-            start = end - overlap
+    if extension.lower() == '.csv':
+        # Los CSV se leen fila a fila y se trocean sin partir filas
+        from extractors.csv_rows import chunk_csv
+        table = chunk_csv(file_path, build_index=CSV_COLUMN_INDEX)
+        return {
+            "store": ChunkStore.from_chunks(table.bodies, prefix=table.header_line),
+            "column_index": table.index
+        }
+    
+    if extension.lower() in ['.md', '.txt']:
+        # Conservar títulos, listas y párrafos; cada chunk sabe a qué sección pertenece
+        from extractors.sections import chunk_structured_file
+        chunks, sections = chunk_structured_file(file_path, markdown=extension.lower() == '.md')
+        return {"store": ChunkStore.from_chunks(chunks, sections)}
+    
+    if extension.lower() == '.docx':
+        # Cada párrafo y cada fila de tabla es un bloque: los chunks no parten filas
+        from extractors.docx_stream import iter_docx_blocks
+        from extractors.sections import PARAGRAPH, chunk_blocks
+        blocks = ((PARAGRAPH, " ".join(block.split()), 0) for block in iter_docx_blocks(file_path))
+        chunks, sections = chunk_blocks(blocks)
+        return {"store": ChunkStore.from_chunks(chunks, sections)}
     
-    return chunks
+    # Un solo buffer con el texto; los chunks solapados son offsets sobre él
+    return {"store": ChunkStore.from_text(process_text(extract_text(file_path, stats)))}
 
-# Función para consultar a la API de Deepseek
-async def query_deepseek(question, document_text, chat_history=[]):
+# Texto de un chunk para el contexto, precedido del título de su sección
+def format_chunk(document, index):
+    chunk = document.store.chunk(index)
+    section = document.store.section(index)
+    if section:
+        return f"[{section}]\n{chunk}"
+    return chunk
+
+# Índice léxico del documento, construido la primera vez que se consulta
+def get_lexical_index(document):
+    if document.lexical_index is None:
+        document.lexical_index = LexicalIndex.build(document.store)
+    return document.lexical_index
+
+# Seleccionar los chunks de contexto (índices) de varias preguntas a la vez
+def select_contexts(document, questions, limit=3):
+    selected = [None] * len(questions)
+    
+    # Preguntas estructuradas ("precio del producto X"): ir directo a las filas
+    if document.column_index is not None:
+        for position, question in enumerate(questions):
+            hits = document.column_index.lookup(question, limit)
+            if hits:
+                selected[position] = hits
+    
+    # El resto se puntúa en bloque con BM25; sin coincidencias, los primeros chunks
+    pending = [position for position, hits in enumerate(selected) if hits is None]
+    if pending:
+        ranked = get_lexical_index(document).search_many([questions[p] for p in pending], limit)
+        for position, hits in zip(pending, ranked):
+            selected[position] = hits or list(range(min(limit, len(document.store))))
+    return selected
+
+# Seleccionar los chunks de contexto para una pregunta
+def select_context(document, question, limit=3):
+    return [format_chunk(document, i) for i in select_contexts(document, [question], limit)[0]]
+
+# Chunks recuperados en el último turno de cada sesión de chat
+sessions = SessionCache(SESSION_CACHE_SIZE, SESSION_TTL)
+
+# Chunks de un turno de conversación: la consulta incluye los términos del
+# historial si la pregunta no se entiende sola, y si los chunks del turno
+# anterior de la sesión ya la cubren se reutilizan sin volver a buscar
+def select_turn_context(document, document_id, question, chat_history, session_id=None):
+    index = get_lexical_index(document)
+    query = rewrite_query(question, chat_history, index) if QUERY_REWRITE_ENABLED and chat_history else question
+    if query != question:
+        metrics["queries_rewritten"] += 1
+    
+    if session_id:
+        session_id = session_id[:128]
+        metrics["session_lookups"] += 1
+        previous = sessions.get(session_id, document_id)
+        if previous is not None:
+            coverage = index.coverage(query, previous)
+            # Sin términos del documento ("¿y eso?"), seguir con el contexto anterior
+            if coverage is None or coverage >= SESSION_REUSE_COVERAGE:
+                metrics["session_reuses"] += 1
+                sessions.put(session_id, document_id, previous)
+                return previous
+    
+    chunk_ids = select_contexts(document, [query])[0]
+    if session_id:
+        sessions.put(session_id, document_id, chunk_ids)
+    return chunk_ids
+
+# Cliente HTTP compartido: reutiliza las conexiones con el proveedor entre peticiones
+http_client = None
+
+def get_http_client():
+    global http_client
+    if http_client is None:
+        import httpx
+        http_client = httpx.AsyncClient(
+            timeout=60.0,
+            limits=httpx.Limits(max_connections=100, max_keepalive_connections=20)
+        )
+    return http_client
+
+# Backends de generación y, para los que admiten lotes, su agrupador de peticiones
+backends, batchers = load_backends({
+    "deepseek": {"type": "chat", "url": DEEPSEEK_API_URL, "api_key": DEEPSEEK_API_KEY, "model": "deepseek-chat"},
+    "local": {"type": "local"},
+    **LLM_BACKENDS
+}, get_http_client)
+if LLM_PROVIDER not in backends:
+    raise RuntimeError(f"LLM_PROVIDER desconocido: {LLM_PROVIDER}")
+
+# Proveedor y modelo de un chatbot (o los de por defecto)
+def llm_choice(key):
+    config = chatbots.get(key) or {}
+    provider = config.get("provider")
+    if provider not in backends:
+        provider = LLM_PROVIDER
+    return provider, config.get("model")
+
+def check_provider(provider):
+    if provider is not None and provider not in backends:
+        raise HTTPException(status_code=400, detail=f"Proveedor no disponible: {provider}")
+
+# Mensajes para el proveedor a partir del contexto y el historial
+def build_messages(question, context_chunks, chat_history=[]):
     # Preparar el contexto del documento
-    chunks = chunk_text(document_text)
-    context = "\n\n".join(chunks[:3])  # Usar los primeros chunks para el contexto
+    context = "\n\n".join(context_chunks)
     
     # Construir el historial de chat formateado
     formatted_history = []
@@ -131,33 +395,25 @@ async def query_deepseek(question, document_text, chat_history=[]):
     # Insertar historial si existe
     if formatted_history:
         messages = [messages[0]] + formatted_history + [messages[1]]
-    
+    return messages
+
+# Llamada al proveedor; devuelve (respuesta, usage) y lanza una excepción si falla
+async def request_completion(messages, provider=None, model=None):
+    provider = provider or LLM_PROVIDER
+    metrics["upstream_calls"] += 1
+    batcher = batchers.get(provider)
+    if batcher is not None:
+        return await batcher.complete(messages, model)
+    return await backends[provider].complete(messages, model)
+
+# Función para consultar al proveedor del chatbot
+async def query_llm(question, context_chunks, chat_history=[], provider=None, model=None):
     try:
-        async with httpx.AsyncClient(timeout=60.0) as client:
-            response = await client.post(
-                DEEPSEEK_API_URL,
-                headers={
-                    "Authorization": f"Bearer {DEEPSEEK_API_KEY}",
-                    "Content-Type": "application/json"
-                },
-                json={
-                    "model": "deepseek-chat",
-                    "messages": messages,
-                    "temperature": 0.1,  # Baja temperatura para respuestas más precisas
-                    "max_tokens": 500
-                }
-            )
-            
-            result = response.json()
-            
-            if "choices" in result and len(result["choices"]) > 0:
-                return result["choices"][0]["message"]["content"]
-            else:
-                raise ValueError("No se recibió una respuesta válida de Deepseek")
-                
+        return await request_completion(build_messages(question, context_chunks, chat_history), provider, model)
     except Exception as e:
-        print(f"Error al consultar Deepseek: {str(e)}")
-        return f"Lo siento, hubo un problema al procesar tu pregunta. Error: {str(e)}"
+        metrics["upstream_errors"] += 1
+        print(f"Error al consultar el proveedor {provider or LLM_PROVIDER}: {str(e)}")
+        return f"Lo siento, hubo un problema al procesar tu pregunta. Error: {str(e)}", {}
 
 # Página principal con HTML básico 
 @app.get("/", response_class=HTMLResponse)
@@ -247,8 +503,8 @@ async def get_dashboard():
                                     <input type="text" class="form-control" id="chatbotName" required>
                                 </div>
                                 <div class="mb-3">
-                                    <label for="document" class="form-label">Documento (.pdf, .docx, .txt)</label>
-                                    <input type="file" class="form-control" id="document" accept=".pdf,.docx,.txt">
+                                    <label for="document" class="form-label">Documento (.pdf, .docx, .txt, .md, .csv)</label>
+                                    <input type="file" class="form-control" id="document" accept=".pdf,.docx,.txt,.md,.csv">
                                 </div>
                                 <div class="mb-3">
                                     <label for="primaryColor" class="form-label">Color primario</label>
@@ -280,19 +536,40 @@ async def get_dashboard():
     </html>
     """
 
-# Ruta para obtener la lista de chatbots
+# Ruta para obtener la lista de chatbots (filtrada, ordenada y paginada en el servidor)
 @app.get("/api/chatbots")
-async def get_chatbots():
-    chatbots_list = []
-    for chatbot_id, config in chatbots.items():
-        chatbots_list.append({
-            "id": chatbot_id,
-            "name": config["name"],
-            "document_name": documents[config["document_id"]]["filename"] if config["document_id"] in documents else "Unknown",
-            "primary_color": config["primary_color"],
-            "created_at": config.get("created_at", "")
-        })
-    return chatbots_list
+async def get_chatbots(
+    owner_id: Optional[str] = None,
+    document_id: Optional[str] = None,
+    q: Optional[str] = None,
+    sort: str = Query("created_at", pattern="^(created_at|name)$"),
+    order: str = Query("desc", pattern="^(asc|desc)$"),
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = None
+):
+    try:
+        items, next_cursor, total = chatbots.query(
+            owner_id=owner_id, document_id=document_id, name=q,
+            sort=sort, order=order, cursor=cursor, limit=limit
+        )
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    # El cuerpo sigue siendo una lista; la paginación viaja en cabeceras
+    headers = {}
+    if next_cursor:
+        headers["X-Next-Cursor"] = next_cursor
+    if total is not None:
+        headers["X-Total-Count"] = str(total)
+    return JSONResponse(content=items, headers=headers)
+
+# Acumular las estadísticas de una ingesta en las métricas del servicio
+def record_ingestion(stats):
+    metrics["documents_ingested"] += 1
+    metrics["ingest_ms"] += stats["ingest_ms"]
+    for field in metrics["pdf"]:
+        if field in stats:
+            metrics["pdf"][field] += stats[field]
 
 # Ruta para subir documentos
 @app.post("/api/upload-document/")
@@ -301,26 +578,27 @@ async def upload_document(document: UploadFile = File(...)):
     document_id = str(uuid.uuid4())
     
     # Crear directorio para guardar el archivo
-    file_path = f"uploads/{document_id}_{document.filename}"
+    file_path = f"{UPLOADS_DIR}/{document_id}_{document.filename}"
     
     try:
+        os.makedirs(UPLOADS_DIR, exist_ok=True)
+        
         # Guardar el archivo
         with open(file_path, "wb") as buffer:
             shutil.copyfileobj(document.file, buffer)
         
         # Extraer texto del documento
         try:
-            document_text = extract_text(file_path)
-            document_text = process_text(document_text)
+            start = time.perf_counter()
+            stats = {}
+            ingested = ingest_document(file_path, stats)
             
-            # Almacenar el texto
-            documents[document_id] = {
-                "filename": document.filename,
-                "path": file_path,
-                "text": document_text
-            }
+            # Almacenar los chunks del documento
+            documents[document_id] = DocumentRecord(document.filename, file_path, **ingested)
             
-            return {"document_id": document_id, "filename": document.filename}
+            stats["ingest_ms"] = round((time.perf_counter() - start) * 1000, 1)
+            record_ingestion(stats)
+            return {"document_id": document_id, "filename": document.filename, "ingestion": stats}
         
         except Exception as e:
             os.remove(file_path)  # Eliminar archivo si hay error
@@ -337,17 +615,24 @@ async def create_chatbot(config: ChatbotConfig):
     # Verificar que el documento existe
     if config.document_id not in documents:
         raise HTTPException(status_code=404, detail="Documento no encontrado")
+    check_provider(config.provider)
     
     # Guardar la configuración del chatbot
-    chatbots[chatbot_id] = {
+    chatbots.add(chatbot_id, {
         "name": config.name,
         "document_id": config.document_id,
         "primary_color": config.primary_color,
         "bubble_icon": config.bubble_icon,
         "welcome_message": config.welcome_message,
         "placeholder_text": config.placeholder_text,
-        "created_at": "2025-04-11" # En producción usaríamos datetime.now().isoformat()
-    }
+        "owner_id": config.owner_id,
+        "daily_token_quota": config.daily_token_quota,
+        "fast_path": config.fast_path,
+        "fast_path_threshold": config.fast_path_threshold,
+        "provider": config.provider,
+        "model": config.model,
+        "created_at": datetime.now().isoformat(timespec="seconds")
+    }, document_name=documents[config.document_id].filename)
     
     return {"chatbot_id": chatbot_id}
 
@@ -361,7 +646,7 @@ async def get_chatbot(chatbot_id: str):
     document_info = {"filename": "Unknown"}
     
     if config["document_id"] in documents:
-        document_info = {"filename": documents[config["document_id"]]["filename"]}
+        document_info = {"filename": documents[config["document_id"]].filename}
     
     return {
         "id": chatbot_id,
@@ -371,7 +656,14 @@ async def get_chatbot(chatbot_id: str):
         "primary_color": config["primary_color"],
         "bubble_icon": config["bubble_icon"],
         "welcome_message": config["welcome_message"],
-        "placeholder_text": config["placeholder_text"]
+        "placeholder_text": config["placeholder_text"],
+        "owner_id": config.get("owner_id"),
+        "daily_token_quota": config.get("daily_token_quota"),
+        "fast_path": config.get("fast_path"),
+        "fast_path_threshold": config.get("fast_path_threshold"),
+        "provider": config.get("provider"),
+        "model": config.get("model"),
+        "created_at": config.get("created_at", "")
     }
 
 # Ruta para actualizar un chatbot
@@ -383,16 +675,14 @@ async def update_chatbot(chatbot_id: str, config: ChatbotConfig):
     # Verificar que el documento existe
     if config.document_id not in documents:
         raise HTTPException(status_code=404, detail="Documento no encontrado")
+    check_provider(config.provider)
+    previous_document_id = chatbots[chatbot_id]["document_id"]
     
-    # Actualizar la configuración
-    chatbots[chatbot_id].update({
-        "name": config.name,
-        "document_id": config.document_id,
-        "primary_color": config.primary_color,
-        "bubble_icon": config.bubble_icon,
-        "welcome_message": config.welcome_message,
-        "placeholder_text": config.placeholder_text
-    })
+    # Actualizar solo los campos enviados: el formulario del panel no envía
+    # propietario, cuota, respuesta extractiva ni proveedor, y se conservan
+    chatbots.update(chatbot_id, config.model_dump(exclude_unset=True),
+                    document_name=documents[config.document_id].filename)
+    reaper.release(previous_document_id)
     
     return {"message": "Chatbot actualizado correctamente"}
 
@@ -402,12 +692,97 @@ async def delete_chatbot(chatbot_id: str):
     if chatbot_id not in chatbots:
         raise HTTPException(status_code=404, detail="Chatbot no encontrado")
     
-    del chatbots[chatbot_id]
+    config = chatbots.remove(chatbot_id)
+    reaper.release(config["document_id"])
+    limiter.forget(chatbot_id)
     return {"message": "Chatbot eliminado correctamente"}
 
+# Clave de uso de una pregunta: el chatbot si corresponde al documento, si no el documento
+def usage_key(question_data):
+    config = chatbots.get(question_data.chatbot_id) if question_data.chatbot_id else None
+    if config and config["document_id"] == question_data.document_id:
+        return question_data.chatbot_id
+    return document_key(question_data.document_id)
+
+# Clave de uso de un documento: acumula lo consumido con y sin chatbot
+def document_key(document_id):
+    return f"doc:{document_id}"
+
+# Solo se guardan contadores de chatbots y documentos que existen
+def is_known_usage_key(key):
+    if key.startswith("doc:"):
+        return key[len("doc:"):] in documents
+    return key in chatbots
+
+# Cuota diaria de una clave de uso (None = la global). Sin chatbot se aplica
+# al consumo total del documento la más estricta de sus chatbots, para que
+# omitir chatbot_id no salte la cuota
+def daily_quota(key, document_id):
+    config = chatbots.get(key)
+    if config:
+        return config.get("daily_token_quota")
+    quotas = []
+    for chatbot_id in chatbots.ids_for_document(document_id):
+        quota = chatbots[chatbot_id].get("daily_token_quota")
+        quotas.append(DAILY_TOKEN_QUOTA if quota is None else quota)
+    if not quotas:
+        return None
+    limited = [quota for quota in quotas if quota > 0]
+    return min(limited) if limited else 0
+
+# Registrar el consumo en la clave de uso y en el total del documento
+def record_usage(key, document_id, usage):
+    limiter.record_usage(key, usage)
+    if key != document_key(document_id):
+        limiter.record_usage(document_key(document_id), usage)
+
+# IP del cliente (detrás de un proxy de confianza, la de X-Forwarded-For)
+def client_ip(request: Request):
+    if TRUST_PROXY_HEADERS:
+        forwarded = request.headers.get("x-forwarded-for")
+        if forwarded:
+            return forwarded.split(",")[0].strip()
+    return request.client.host if request.client else None
+
+# Respuesta 429 para un límite superado
+def limit_exceeded(e: LimitExceeded):
+    return HTTPException(
+        status_code=429,
+        detail=e.detail,
+        headers={"Retry-After": str(max(1, math.ceil(e.retry_after)))}
+    )
+
+# Rechazar con 429 antes de hacer trabajo costoso si se supera algún límite
+def enforce_limits(request: Request, key, document_id):
+    try:
+        limiter.check(key, origin=request.headers.get("origin"), ip=client_ip(request), quota=daily_quota(key, document_id))
+    except LimitExceeded as e:
+        raise limit_exceeded(e)
+
+# Umbral de la respuesta extractiva para un chatbot (None si está desactivada)
+def fast_path_threshold(key):
+    config = chatbots.get(key) or {}
+    enabled = config.get("fast_path")
+    if not (FAST_PATH_ENABLED if enabled is None else enabled):
+        return None
+    threshold = config.get("fast_path_threshold")
+    return FAST_PATH_THRESHOLD if threshold is None else threshold
+
+# Responder con una frase del documento si cubre la pregunta con suficiente confianza
+def try_fast_path(document, question, chunk_ids, threshold):
+    start = time.perf_counter()
+    chunks = [document.store.chunk(i) for i in chunk_ids]
+    sentence, confidence = extract_answer(question, chunks, get_lexical_index(document).idf)
+    metrics["fast_path_checks"] += 1
+    metrics["fast_path_ms"] += (time.perf_counter() - start) * 1000
+    if sentence is not None and confidence >= threshold:
+        metrics["fast_path_hits"] += 1
+        return sentence
+    return None
+
 # Ruta para hacer preguntas al chatbot
 @app.post("/api/ask-question/")
-async def ask_question(question_data: Question):
+async def ask_question(question_data: Question, request: Request):
     document_id = question_data.document_id
     question = question_data.question
     chat_history = question_data.chat_history
@@ -415,357 +790,409 @@ async def ask_question(question_data: Question):
     if document_id not in documents:
         raise HTTPException(status_code=404, detail="Documento no encontrado")
     
+    key = usage_key(question_data)
+    enforce_limits(request, key, document_id)
+    reaper.touch(document_id)
+    
     try:
-        # Obtener el texto del documento
-        document_text = documents[document_id]["text"]
+        # Obtener el contexto relevante del documento
+        document = documents[document_id]
+        chunk_ids = select_turn_context(document, document_id, question, chat_history, question_data.session_id)
+        metrics["questions"] += 1
+        
+        # Si una frase del documento responde la pregunta, no llamar al proveedor
+        threshold = fast_path_threshold(key)
+        answer = try_fast_path(document, question, chunk_ids, threshold) if threshold is not None else None
+        if answer is not None:
+            return {"answer": answer, "fast_path": True}
+        
+        # Consultar al proveedor del chatbot
+        context_chunks = [format_chunk(document, i) for i in chunk_ids]
+        provider, model = llm_choice(key)
+        answer, usage = await query_llm(question, context_chunks, chat_history, provider, model)
+        record_usage(key, document_id, usage)
         
-        # Consultar a la API de Deepseek
-        answer = await query_deepseek(question, document_text, chat_history)
+        if warmup_status["boot_to_first_answer_ms"] is None:
+            warmup_status["boot_to_first_answer_ms"] = elapsed_since_boot_ms()
         
-        return {"answer": answer}
+        return {"answer": answer, "fast_path": False}
     
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error al procesar la pregunta: {str(e)}")
 
-# Widget JavaScript para incrustar en sitios web
+# Responder una pregunta de un lote; los errores se devuelven en la propia línea
+async def answer_batch_item(position, question, chunk_ids, document, semaphore, key, document_id, quota, threshold, llm):
+    metrics["questions"] += 1
+    line = {"index": position, "question": question, "chunks": chunk_ids}
+    if threshold is not None:
+        start = time.perf_counter()
+        answer = try_fast_path(document, question, chunk_ids, threshold)
+        if answer is not None:
+            line["answer"] = answer
+            line["fast_path"] = True
+            line["latency_ms"] = round((time.perf_counter() - start) * 1000, 1)
+            return line
+    
+    async with semaphore:
+        start = time.perf_counter()
+        try:
+            limiter.check_quota(key, quota)
+            context_chunks = [format_chunk(document, i) for i in chunk_ids]
+            answer, usage = await request_completion(build_messages(question, context_chunks), *llm)
+            record_usage(key, document_id, usage)
+            line["answer"] = answer
+            line["usage"] = usage
+        except LimitExceeded as e:
+            line["error"] = e.detail
+        except Exception as e:
+            metrics["upstream_errors"] += 1
+            line["error"] = f"Error al procesar la pregunta: {str(e)}"
+        line["latency_ms"] = round((time.perf_counter() - start) * 1000, 1)
+        return line
+
+# Ruta para hacer muchas preguntas sobre un documento (evaluación, generación de FAQ)
+# La recuperación se hace para todo el lote de una vez y las respuestas se
+# devuelven en NDJSON según terminan, con una línea final de resumen
+@app.post("/api/ask-batch/")
+async def ask_batch(batch: BatchQuestions, request: Request):
+    require_admin(request)
+    if not batch.questions:
+        raise HTTPException(status_code=400, detail="El lote no contiene preguntas")
+    if len(batch.questions) > BATCH_MAX_QUESTIONS:
+        raise HTTPException(status_code=400, detail=f"El lote admite como máximo {BATCH_MAX_QUESTIONS} preguntas")
+    
+    if batch.document_id not in documents:
+        raise HTTPException(status_code=404, detail="Documento no encontrado")
+    
+    # Cada pregunta del lote cuenta como una petición en el límite de lotes
+    # (no en los del widget); las que no caben se devuelven como error sin
+    # consultar al proveedor. La cuota diaria se comprueba además en cada una
+    key = usage_key(batch)
+    quota = daily_quota(key, batch.document_id)
+    try:
+        granted = limiter.check_batch(key, quota=quota, cost=len(batch.questions))
+    except LimitExceeded as e:
+        raise limit_exceeded(e)
+    questions = batch.questions[:granted]
+    threshold = fast_path_threshold(key)
+    llm = llm_choice(key)
+    concurrency = max(1, min(batch.concurrency or BATCH_CONCURRENCY, BATCH_MAX_CONCURRENCY))
+    
+    started = time.perf_counter()
+    reaper.touch(batch.document_id)
+    document = await asyncio.to_thread(documents.__getitem__, batch.document_id)
+    contexts = await asyncio.to_thread(select_contexts, document, questions)
+    retrieval_ms = round((time.perf_counter() - started) * 1000, 1)
+    
+    async def stream():
+        semaphore = asyncio.Semaphore(concurrency)
+        tasks = [
+            asyncio.create_task(answer_batch_item(position, question, chunk_ids, document, semaphore, key, batch.document_id, quota, threshold, llm))
+            for position, (question, chunk_ids) in enumerate(zip(questions, contexts))
+        ]
+        latencies = []
+        errors = 0
+        fast_path_hits = 0
+        tokens = {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0}
+        try:
+            for position in range(granted, len(batch.questions)):
+                line = {"index": position, "question": batch.questions[position],
+                        "error": "Demasiadas peticiones, inténtalo de nuevo más tarde"}
+                yield json.dumps(line, ensure_ascii=False) + "\n"
+            for finished in asyncio.as_completed(tasks):
+                line = await finished
+                latencies.append(line["latency_ms"])
+                if "error" in line:
+                    errors += 1
+                if line.get("fast_path"):
+                    fast_path_hits += 1
+                for field in tokens:
+                    tokens[field] += line.get("usage", {}).get(field) or 0
+                yield json.dumps(line, ensure_ascii=False) + "\n"
+            
+            latencies.sort()
+            summary = {
+                "questions": len(batch.questions),
+                "answered": len(tasks) - errors,
+                "errors": errors + len(batch.questions) - granted,
+                "rate_limited": len(batch.questions) - granted,
+                "fast_path_hits": fast_path_hits,
+                "concurrency": concurrency,
+                "retrieval_ms": retrieval_ms,
+                "wall_ms": round((time.perf_counter() - started) * 1000, 1),
+                "latency_ms": {
+                    "mean": round(sum(latencies) / len(latencies), 1),
+                    "p50": percentile(latencies, 0.50),
+                    "p95": percentile(latencies, 0.95),
+                    "max": latencies[-1]
+                },
+                "tokens": tokens
+            }
+            yield json.dumps({"summary": summary}) + "\n"
+        finally:
+            # Si el cliente se desconecta, no seguir consumiendo tokens
+            for task in tasks:
+                task.cancel()
+    
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+# Ruta para consultar el consumo de un chatbot
+@app.get("/api/chatbots/{chatbot_id}/usage")
+async def get_chatbot_usage(chatbot_id: str):
+    if chatbot_id not in chatbots:
+        raise HTTPException(status_code=404, detail="Chatbot no encontrado")
+    
+    usage = limiter.usage(chatbot_id)
+    quota = chatbots[chatbot_id].get("daily_token_quota")
+    usage["daily_token_quota"] = quota if quota is not None else DAILY_TOKEN_QUOTA
+    return usage
+
+# Progreso del arranque, expuesto en /api/ready
+warmup_status = {
+    "state": "pending",
+    "upstream": "pending",
+    "documents_restored": 0,
+    "chatbots_restored": 0,
+    "documents_to_warm": 0,
+    "documents_warmed": 0,
+    "finished_at_ms": None,
+    "boot_to_first_answer_ms": None
+}
+
+def elapsed_since_boot_ms():
+    return round((time.monotonic() - BOOT_TIME) * 1000, 1)
+
+# Abrir por adelantado una conexión con el proveedor para no pagar DNS y TLS en la primera pregunta
+async def open_upstream_connection():
+    import httpx
+    url = getattr(backends[LLM_PROVIDER], "url", None)
+    if url is None:
+        warmup_status["upstream"] = "local"
+        return
+    parts = urlsplit(url)
+    try:
+        await get_http_client().head(f"{parts.scheme}://{parts.netloc}/")
+        warmup_status["upstream"] = "connected"
+    except httpx.HTTPError as e:
+        warmup_status["upstream"] = f"failed: {str(e)}"
+
+# Cargar los documentos de los chatbots más usados antes de que llegue su primera pregunta
+async def warm_top_documents():
+    targets = []
+    for key in limiter.most_used(WARMUP_CHATBOTS):
+        config = chatbots.get(key)
+        document_id = config["document_id"] if config else key[len("doc:"):] if key.startswith("doc:") else None
+        if document_id in documents and document_id not in targets:
+            targets.append(document_id)
+    
+    warmup_status["documents_to_warm"] = len(targets)
+    for document_id in targets:
+        try:
+            # Cargar el documento y construir su índice léxico
+            await asyncio.to_thread(lambda: get_lexical_index(documents.warm(document_id)))
+            warmup_status["documents_warmed"] += 1
+        except (OSError, ValueError) as e:
+            print(f"Error al precargar el documento {document_id}: {str(e)}")
+
+async def warm_up():
+    warmup_status["state"] = "running"
+    await asyncio.gather(open_upstream_connection(), warm_top_documents())
+    warmup_status["state"] = "done"
+    warmup_status["finished_at_ms"] = elapsed_since_boot_ms()
+
+# Guardar periódicamente el estado (chatbots y contadores de uso)
+async def flush_state_periodically(interval=5):
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            limiter.prune()
+            limiter.save()
+            chatbots.save(CHATBOTS_STATE_FILE)
+        except OSError as e:
+            print(f"Error al guardar el estado: {str(e)}")
+
+# Recolectar periódicamente los documentos y subidas sin chatbots
+async def reap_periodically(interval):
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await reaper.sweep()
+            # Sin los contadores de los documentos recolectados
+            limiter.retain(is_known_usage_key)
+        except OSError as e:
+            print(f"Error al recolectar documentos: {str(e)}")
+
+@app.on_event("startup")
+async def restore_state():
+    os.makedirs(STATIC_DIR, exist_ok=True)
+    
+    # Restaurar solo índices ligeros; los documentos se cargan al usarse o en el precalentamiento
+    warmup_status["documents_restored"] = documents.scan()
+    warmup_status["chatbots_restored"] = chatbots.load(CHATBOTS_STATE_FILE)
+    limiter.load()
+    limiter.retain(is_known_usage_key)
+    app.state.flush_task = asyncio.create_task(flush_state_periodically())
+    app.state.reaper_task = asyncio.create_task(reap_periodically(GC_INTERVAL)) if GC_ENABLED else None
+    
+    # El precalentamiento corre en segundo plano y no retrasa la disponibilidad
+    if WARMUP_ENABLED:
+        app.state.warmup_task = asyncio.create_task(warm_up())
+    else:
+        warmup_status["state"] = "disabled"
+
+@app.on_event("shutdown")
+async def save_state():
+    app.state.flush_task.cancel()
+    if app.state.reaper_task is not None:
+        app.state.reaper_task.cancel()
+    limiter.save()
+    chatbots.save(CHATBOTS_STATE_FILE)
+    if http_client is not None:
+        await http_client.aclose()
+
+# Ruta de disponibilidad con el progreso del precalentamiento
+@app.get("/api/ready")
+async def get_readiness():
+    return {
+        "ready": True,
+        "uptime_ms": elapsed_since_boot_ms(),
+        "documents_loaded": documents.loaded_count,
+        "warmup": warmup_status
+    }
+
+# Ruta de métricas: preguntas, llamadas al proveedor y tasa de respuestas extractivas
+@app.get("/api/metrics")
+async def get_metrics():
+    checks = metrics["fast_path_checks"]
+    pdf_stats = metrics["pdf"]
+    return {
+        **metrics,
+        "fast_path_ms": round(metrics["fast_path_ms"], 1),
+        "ingest_ms": round(metrics["ingest_ms"], 1),
+        "pdf": {
+            **{field: round(value, 1) for field, value in metrics["pdf"].items()},
+            "cache_hit_rate": round(pdf_stats["cache_hits"] / pdf_stats["text_pages"], 4) if pdf_stats["text_pages"] else 0.0,
+            "skipped_pages": pdf_stats["image_pages"] + pdf_stats["empty_pages"]
+        },
+        "fast_path_hit_rate": round(metrics["fast_path_hits"] / checks, 4) if checks else 0.0,
+        "fast_path_share": round(metrics["fast_path_hits"] / metrics["questions"], 4) if metrics["questions"] else 0.0,
+        "fast_path_avg_ms": round(metrics["fast_path_ms"] / checks, 3) if checks else 0.0,
+        "session_reuse_rate": round(metrics["session_reuses"] / metrics["session_lookups"], 4) if metrics["session_lookups"] else 0.0,
+        "active_sessions": len(sessions),
+        "micro_batches": {
+            name: {"batches": batcher.batches, "requests": batcher.requests}
+            for name, batcher in batchers.items()
+        },
+        "gc": {**reaper.stats, "orphaned_documents": reaper.orphaned}
+    }
+
+# Verificar el token de administración
+def require_admin(request: Request):
+    token = request.headers.get("x-admin-token", "")
+    if not ADMIN_TOKEN or not hmac.compare_digest(token.encode(), ADMIN_TOKEN.encode()):
+        raise HTTPException(status_code=403, detail="Acceso denegado")
+
+# Ruta para listar los perfiles capturados
+@app.get("/api/admin/profiles")
+async def list_profiles(request: Request):
+    require_admin(request)
+    return profile_store.list()
+
+# Ruta para descargar un perfil (.prof de cProfile o pilas "folded")
+@app.get("/api/admin/profiles/{profile_id}")
+async def get_profile(profile_id: str, request: Request, format: str = "raw"):
+    require_admin(request)
+    meta = profile_store.get(profile_id)
+    if meta is None or not os.path.exists(meta["file"]):
+        raise HTTPException(status_code=404, detail="Perfil no encontrado")
+
+    # Resumen legible de un perfil cProfile, ordenado por tiempo acumulado
+    if format == "text" and meta["mode"] == "cprofile":
+        import pstats
+        output = io.StringIO()
+        pstats.Stats(meta["file"], stream=output).sort_stats("cumulative").print_stats(50)
+        return PlainTextResponse(output.getvalue())
+
+    return FileResponse(meta["file"], filename=os.path.basename(meta["file"]), media_type="application/octet-stream")
+
+# Bundle del widget (ver widget/build.py): común a todos los chatbots, con el
+# hash del contenido en el nombre, así que se puede cachear indefinidamente.
+# Si no se generó en el build ("python -m widget.build"), se genera la primera
+# vez que se pide
+WIDGET_DIR = os.path.join(STATIC_DIR, "widget")
+WIDGET_BOOTSTRAP_MAX_AGE = int(os.environ.get("WIDGET_BOOTSTRAP_MAX_AGE", "300"))
+widget_bundle = None
+
+def get_widget_bundle():
+    global widget_bundle
+    if widget_bundle is None:
+        from widget import build
+        try:
+            with open(os.path.join(WIDGET_DIR, build.MANIFEST), encoding="utf-8") as f:
+                name = json.load(f)["widget.js"]
+            if not os.path.exists(os.path.join(WIDGET_DIR, f"{name}.gz")):
+                raise FileNotFoundError(name)
+        except (OSError, ValueError, KeyError):
+            name = build.build(WIDGET_DIR)["widget.js"]
+        with open(os.path.join(WIDGET_DIR, name), "rb") as f:
+            content = f.read()
+        with open(os.path.join(WIDGET_DIR, f"{name}.gz"), "rb") as f:
+            compressed = f.read()
+        widget_bundle = {"name": name, "content": content, "gzip": compressed}
+    return widget_bundle
+
+@app.get("/assets/widget/{filename}")
+async def get_widget_bundle_file(filename: str, request: Request):
+    bundle = get_widget_bundle()
+    if filename != bundle["name"]:
+        if filename.startswith("widget.") and filename.endswith(".js"):
+            # Versión anterior (páginas con un script de arranque aún en caché)
+            return Response(status_code=307, headers={
+                "Location": f"/assets/widget/{bundle['name']}",
+                "Cache-Control": "no-cache"
+            })
+        raise HTTPException(status_code=404, detail="Archivo no encontrado")
+
+    headers = {
+        "Cache-Control": "public, max-age=31536000, immutable",
+        "ETag": f'"{bundle["name"]}"',
+        "Vary": "Accept-Encoding"
+    }
+    if request.headers.get("if-none-match") == headers["ETag"]:
+        return Response(status_code=304, headers=headers)
+    if "gzip" in request.headers.get("accept-encoding", ""):
+        headers["Content-Encoding"] = "gzip"
+        return Response(content=bundle["gzip"], media_type="application/javascript", headers=headers)
+    return Response(content=bundle["content"], media_type="application/javascript", headers=headers)
+
+# Script de arranque de cada chatbot: solo su configuración y la carga del
+# bundle común (una vez por página aunque haya varios widgets)
 @app.get("/api/widget/{chatbot_id}.js")
-async def get_widget_script(chatbot_id: str):
+async def get_widget_script(chatbot_id: str, request: Request):
     if chatbot_id not in chatbots:
         raise HTTPException(status_code=404, detail="Chatbot no encontrado")
     
     config = chatbots[chatbot_id]
+    base_url = os.environ.get("BASE_URL") or str(request.base_url).rstrip('/')
+    widget_config = json.dumps({
+        "chatbotId": chatbot_id,
+        "documentId": config["document_id"],
+        "primaryColor": config["primary_color"],
+        "welcomeMessage": config["welcome_message"],
+        "placeholderText": config["placeholder_text"],
+        "apiBase": base_url
+    }, ensure_ascii=False, separators=(",", ":")).replace("</", "<\\/")
+    bundle_url = json.dumps(f"{base_url}/assets/widget/{get_widget_bundle()['name']}")
     
-    # Generar script personalizado para el chatbot
-    script = f"""
-    // DocumentChat Widget v1.0
-    (function() {{
-        const chatbotId = "{chatbot_id}";
-        const primaryColor = "{config['primary_color']}";
-        const welcomeMessage = "{config['welcome_message']}";
-        const placeholderText = "{config['placeholder_text']}";
-        
-        // Crear estilos
-        const style = document.createElement('style');
-        style.innerHTML = `
-            .dc-widget-container {{
-                position: fixed;
-                bottom: 20px;
-                right: 20px;
-                z-index: 9999;
-                font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, Oxygen, Ubuntu, Cantarell, 'Open Sans', sans-serif;
-            }}
-            .dc-chat-button {{
-                width: 60px;
-                height: 60px;
-                border-radius: 50%;
-                background-color: {config['primary_color']};
-                color: white;
-                display: flex;
-                align-items: center;
-                justify-content: center;
-                cursor: pointer;
-                box-shadow: 0 2px 12px rgba(0, 0, 0, 0.15);
-                transition: all 0.3s ease;
-            }}
-            .dc-chat-button:hover {{
-                transform: scale(1.05);
-            }}
-            .dc-chat-window {{
-                display: none;
-                position: fixed;
-                bottom: 90px;
-                right: 20px;
-                width: 350px;
-                height: 500px;
-                background-color: white;
-                border-radius: 12px;
-                overflow: hidden;
-                box-shadow: 0 5px 25px rgba(0, 0, 0, 0.15);
-                flex-direction: column;
-            }}
-            .dc-chat-header {{
-                background-color: {config['primary_color']};
-                color: white;
-                padding: 15px;
-                font-weight: 500;
-                display: flex;
-                justify-content: space-between;
-                align-items: center;
-            }}
-            .dc-chat-close {{
-                cursor: pointer;
-                opacity: 0.8;
-            }}
-            .dc-chat-close:hover {{
-                opacity: 1;
-            }}
-            .dc-chat-messages {{
-                flex: 1;
-                padding: 15px;
-                overflow-y: auto;
-            }}
-            .dc-message {{
-                margin-bottom: 10px;
-                max-width: 80%;
-                padding: 10px 14px;
-                border-radius: 18px;
-                line-height: 1.4;
-                word-wrap: break-word;
-                position: relative;
-            }}
-            .dc-bot-message {{
-                background-color: #f1f1f1;
-                color: #333;
-                border-top-left-radius: 4px;
-                margin-right: auto;
-            }}
-            .dc-user-message {{
-                background-color: {config['primary_color']};
-                color: white;
-                border-top-right-radius: 4px;
-                margin-left: auto;
-            }}
-            .dc-chat-input-container {{
-                border-top: 1px solid #eaeaea;
-                padding: 12px;
-                display: flex;
-            }}
-            .dc-chat-input {{
-                flex: 1;
-                padding: 10px 14px;
-                border: 1px solid #ddd;
-                border-radius: 20px;
-                outline: none;
-                font-size: 14px;
-            }}
-            .dc-chat-input:focus {{
-                border-color: {config['primary_color']};
-            }}
-            .dc-send-button {{
-                margin-left: 8px;
-                width: 36px;
-                height: 36px;
-                border-radius: 50%;
-                background-color: {config['primary_color']};
-                color: white;
-                display: flex;
-                align-items: center;
-                justify-content: center;
-                cursor: pointer;
-                border: none;
-            }}
-            .dc-send-button:disabled {{
-                opacity: 0.5;
-                cursor: not-allowed;
-            }}
-            .dc-loading {{
-                display: flex;
-                padding: 10px;
-                align-items: center;
-            }}
-            .dc-loading-dots {{
-                display: flex;
-            }}
-            .dc-loading-dots span {{
-                width: 8px;
-                height: 8px;
-                border-radius: 50%;
-                background-color: #888;
-                margin: 0 2px;
-                animation: dc-loading 1.4s infinite ease-in-out both;
-            }}
-            .dc-loading-dots span:nth-child(1) {{
-                animation-delay: -0.32s;
-            }}
-            .dc-loading-dots span:nth-child(2) {{
-                animation-delay: -0.16s;
-            }}
-            @keyframes dc-loading {{
-                0%, 80%, 100% {{ transform: scale(0); }}
-                40% {{ transform: scale(1); }}
-            }}
-        `;
-        document.head.appendChild(style);
-        
-        // Crear el HTML del widget
-        const container = document.createElement('div');
-        container.className = 'dc-widget-container';
-        
-        // Botón de chat
-        const chatButton = document.createElement('div');
-        chatButton.className = 'dc-chat-button';
-        chatButton.innerHTML = '<svg width="24" height="24" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2" stroke-linecap="round" stroke-linejoin="round"><path d="M21 15a2 2 0 0 1-2 2H7l-4 4V5a2 2 0 0 1 2-2h14a2 2 0 0 1 2 2z"></path></svg>';
-        container.appendChild(chatButton);
-        
-        // Ventana de chat
-        const chatWindow = document.createElement('div');
-        chatWindow.className = 'dc-chat-window';
-        
-        // Encabezado
-        const chatHeader = document.createElement('div');
-        chatHeader.className = 'dc-chat-header';
-        chatHeader.innerHTML = `
-            <div>DocumentChat</div>
-            <div class="dc-chat-close">✕</div>
-        `;
-        chatWindow.appendChild(chatHeader);
-        
-        // Contenedor de mensajes
-        const messagesContainer = document.createElement('div');
-        messagesContainer.className = 'dc-chat-messages';
-        chatWindow.appendChild(messagesContainer);
-        
-        // Contenedor de entrada
-        const inputContainer = document.createElement('div');
-        inputContainer.className = 'dc-chat-input-container';
-        inputContainer.innerHTML = `
-            <input type="text" class="dc-chat-input" placeholder="${placeholderText}">
-            <button class="dc-send-button" disabled>
-                <svg width="16" height="16" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2" stroke-linecap="round" stroke-linejoin="round">
-                    <line x1="22" y1="2" x2="11" y2="13"></line>
-                    <polygon points="22 2 15 22 11 13 2 9 22 2"></polygon>
-                </svg>
-            </button>
-        `;
-        chatWindow.appendChild(inputContainer);
-        
-        container.appendChild(chatWindow);
-        document.body.appendChild(container);
-        
-        // Funcionalidad
-        const chatInput = document.querySelector('.dc-chat-input');
-        const sendButton = document.querySelector('.dc-send-button');
-        let chatHistory = [];
-        
-        // Mensaje de bienvenida
-        function addWelcomeMessage() {{
-            const welcomeDiv = document.createElement('div');
-            welcomeDiv.className = 'dc-message dc-bot-message';
-            welcomeDiv.textContent = welcomeMessage;
-            messagesContainer.appendChild(welcomeDiv);
-        }}
-        
-        // Mostrar mensaje de carga
-        function showLoading() {{
-            const loadingDiv = document.createElement('div');
-            loadingDiv.className = 'dc-message dc-bot-message dc-loading';
-            loadingDiv.innerHTML = `
-                <div class="dc-loading-dots">
-                    <span></span>
-                    <span></span>
-                    <span></span>
-                </div>
-            `;
-            loadingDiv.id = 'dc-loading-indicator';
-            messagesContainer.appendChild(loadingDiv);
-            messagesContainer.scrollTop = messagesContainer.scrollHeight;
-        }}
-        
-        // Ocultar mensaje de carga
-        function hideLoading() {{
-            const loadingDiv = document.getElementById('dc-loading-indicator');
-            if (loadingDiv) {{
-                loadingDiv.remove();
-            }}
-        }}
-        
-        // Añadir un mensaje al chat
-        function addMessage(content, isUser = false) {{
-            const messageDiv = document.createElement('div');
-            messageDiv.className = isUser ? 'dc-message dc-user-message' : 'dc-message dc-bot-message';
-            messageDiv.textContent = content;
-            messagesContainer.appendChild(messageDiv);
-            messagesContainer.scrollTop = messagesContainer.scrollHeight;
-        }}
-        
-        // Enviar pregunta al servidor
-        async function sendQuestion(question) {{
-            try {{
-                showLoading();
-                
-                const response = await fetch('{os.environ.get("BASE_URL", "https://your-app-url.com")}/api/ask-question/', {{
-                    method: 'POST',
-                    headers: {{
-                        'Content-Type': 'application/json',
-                    }},
-                    body: JSON.stringify({{
-                        question: question,
-                        document_id: "{config['document_id']}",
-                        chat_history: chatHistory
-                    }})
-                }});
-                
-                hideLoading();
-                
-                if (response.ok) {{
-                    const data = await response.json();
-                    addMessage(data.answer);
-                    
-                    // Añadir a historial
-                    chatHistory.push({{
-                        question: question,
-                        answer: data.answer
-                    }});
-                    
-                    // Mantener historial manejable
-                    if (chatHistory.length > 10) {{
-                        chatHistory.shift();
-                    }}
-                }} else {{
-                    const error = await response.json();
-                    addMessage('Lo siento, hubo un problema al procesar tu pregunta.');
-                    console.error('Error:', error);
-                }}
-            }} catch (error) {{
-                hideLoading();
-                addMessage('Lo siento, no pude conectarme con el servidor. Por favor intenta de nuevo más tarde.');
-                console.error('Error:', error);
-            }}
-        }}
-        
-        // Event listeners
-        chatButton.addEventListener('click', () => {{
-            chatWindow.style.display = 'flex';
-            chatButton.style.display = 'none';
-            
-            // Si no hay mensajes, añadir mensaje de bienvenida
-            if (messagesContainer.children.length === 0) {{
-                addWelcomeMessage();
-            }}
-            
-            chatInput.focus();
-        }});document.querySelector('.dc-chat-close').addEventListener('click', () => {
-            chatWindow.style.display = 'none';
-            chatButton.style.display = 'flex';
-        });
-        
-        chatInput.addEventListener('input', () => {
-            sendButton.disabled = chatInput.value.trim() === '';
-        });
-        
-        chatInput.addEventListener('keypress', (e) => {
-            if (e.key === 'Enter' && chatInput.value.trim() !== '') {
-                const question = chatInput.value.trim();
-                addMessage(question, true);
-                chatInput.value = '';
-                sendButton.disabled = true;
-                sendQuestion(question);
-            }
-        });
-        
-        sendButton.addEventListener('click', () => {
-            if (chatInput.value.trim() !== '') {
-                const question = chatInput.value.trim();
-                addMessage(question, true);
-                chatInput.value = '';
-                sendButton.disabled = true;
-                sendQuestion(question);
-            }
-        });
-    }})();
-    """
+    script = (
+        f"(window.DocumentChat=window.DocumentChat||[]).push({widget_config});"
+        f"if(!document.getElementById('dc-bundle')){{"
+        f"var s=document.createElement('script');s.id='dc-bundle';s.async=true;s.src={bundle_url};"
+        f"document.head.appendChild(s);}}"
+    )
     
-    return Response(content=script, media_type="application/javascript")
+    return Response(content=script, media_type="application/javascript",
+                    headers={"Cache-Control": f"public, max-age={WIDGET_BOOTSTRAP_MAX_AGE}"})
 
 # Ruta para obtener el código de integración del widget
 @app.get("/api/chatbots/{chatbot_id}/embed")
@@ -944,6 +1371,8 @@ async def get_chat_page(chatbot_id: str):
             const questionInput = document.getElementById('questionInput');
             const sendButton = document.getElementById('sendButton');
             let chatHistory = [];
+            // Identifica la conversación para reutilizar el contexto entre turnos
+            const sessionId = (window.crypto && crypto.randomUUID) ? crypto.randomUUID() : Date.now().toString(36) + Math.random().toString(36).slice(2);
             
             // Habilitar/deshabilitar botón de envío
             questionInput.addEventListener('input', () => {{
@@ -996,6 +1425,8 @@ async def get_chat_page(chatbot_id: str):
                         body: JSON.stringify({{
                             question: question,
                             document_id: '{config['document_id']}',
+                            chatbot_id: '{chatbot_id}',
+                            session_id: sessionId,
                             chat_history: chatHistory
                         }})
                     }});
@@ -1047,4 +1478,5 @@ async def get_chat_page(chatbot_id: str):
 
 # Punto de entrada para ejecutar la aplicación
 if __name__ == "__main__":
+    import uvicorn
     uvicorn.run("app:app", host="0.0.0.0", port=int(os.environ.get("PORT", 8000)), reload=True)
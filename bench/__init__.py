@@ -0,0 +1,3 @@
+# bench/__init__.py
+# Herramientas de benchmark: servidor Deepseek simulado, generadores de
+# documentos sintéticos y escenarios de carga contra la aplicación.
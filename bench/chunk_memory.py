@@ -0,0 +1,97 @@
+# bench/chunk_memory.py
+"""Memoria residente por documento: representación anterior (dict con el texto
+completo y una lista de chunks solapados) frente a ChunkStore + DocumentRecord,
+sin y con el índice léxico que se construye en la primera consulta.
+
+    python -m bench.chunk_memory --docs 10000
+
+Cada representación se mide en un subproceso propio para que el RSS no se
+contamine entre ellas.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def rss_bytes():
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+
+def legacy_chunks(text, chunk_size=1000, overlap=100):
+    chunks = []
+    start = 0
+    while start < len(text):
+        end = min(start + chunk_size, len(text))
+        if end < len(text):
+            boundary = text.rfind(" ", start + overlap + 1, end)
+            if boundary != -1:
+                end = boundary
+        chunks.append(text[start:end])
+        if end >= len(text):
+            break
+        start = end - overlap
+    return chunks
+
+
+def measure(mode, docs, paragraphs):
+    from bench import docgen
+    from chunk_store import ChunkStore, DocumentRecord
+    from retrieval import LexicalIndex
+
+    templates = [" ".join(docgen.generate_text(paragraphs, seed).split()) for seed in range(32)]
+    documents = {}
+    before = rss_bytes()
+    for i in range(docs):
+        # Texto distinto por documento para que no se compartan objetos
+        text = f"{templates[i % len(templates)]} documento {i}"
+        if mode == "legacy":
+            documents[str(i)] = {
+                "filename": f"doc_{i}.txt",
+                "path": f"uploads/{i}_doc_{i}.txt",
+                "text": text,
+                "chunks": legacy_chunks(text),
+            }
+        else:
+            record = documents[str(i)] = DocumentRecord(f"doc_{i}.txt", f"uploads/{i}_doc_{i}.txt", ChunkStore.from_text(text))
+            if mode == "indexed":
+                record.lexical_index = LexicalIndex.build(record.store)
+        del text
+    after = rss_bytes()
+    return {"mode": mode, "docs": docs, "rss_delta": after - before, "per_doc": (after - before) / docs}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark de memoria del almacenamiento de chunks")
+    parser.add_argument("--docs", type=int, default=10000)
+    parser.add_argument("--paragraphs", type=int, default=10)
+    parser.add_argument("--mode", choices=["legacy", "compact", "indexed"], default=None, help=argparse.SUPPRESS)
+    options = parser.parse_args(argv)
+
+    if options.mode:
+        print(json.dumps(measure(options.mode, options.docs, options.paragraphs)))
+        return
+
+    results = []
+    for mode in ("legacy", "compact", "indexed"):
+        output = subprocess.run(
+            [sys.executable, "-m", "bench.chunk_memory", "--mode", mode,
+             "--docs", str(options.docs), "--paragraphs", str(options.paragraphs)],
+            cwd=REPO_ROOT, check=True, capture_output=True, text=True
+        ).stdout
+        results.append(json.loads(output.strip().splitlines()[-1]))
+
+    print(f"{'representación':<16} {'docs':>7} {'RSS MB':>9} {'KB/doc':>8}")
+    for result in results:
+        print(f"{result['mode']:<16} {result['docs']:>7} {result['rss_delta'] / 1e6:>9.1f} {result['per_doc'] / 1024:>8.2f}")
+    if results[0]["rss_delta"]:
+        for result in results[1:]:
+            print(f"reducción ({result['mode']}): {(1 - result['rss_delta'] / results[0]['rss_delta']) * 100:.1f}%")
+
+
+if __name__ == "__main__":
+    main()
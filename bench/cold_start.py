@@ -0,0 +1,158 @@
+# bench/cold_start.py
+"""Tiempo desde el arranque del proceso hasta la primera respuesta.
+
+Prepara un directorio de datos con documentos, chatbots y estadísticas de uso,
+y después arranca la aplicación (uvicorn en un subproceso) varias veces, con y
+sin precalentamiento, midiendo arranque -> /api/ready y arranque -> primera
+respuesta del chatbot más usado (y cuánto tarda esa primera pregunta por sí sola):
+
+    python -m bench.cold_start --docs 40 --runs 3
+"""
+import argparse
+import os
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+from bench import docgen
+from bench.mock_deepseek import MockConfig, MockServer
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_app(workdir, mock_url, port, warmup):
+    env = dict(os.environ)
+    env.update({
+        "PYTHONPATH": REPO_ROOT,
+        "DEEPSEEK_API_URL": mock_url,
+        "WARMUP_ENABLED": "1" if warmup else "0",
+        "RATE_LIMIT_PER_CHATBOT": "0",
+        "RATE_LIMIT_PER_ORIGIN": "0",
+        "RATE_LIMIT_PER_IP": "0",
+    })
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app:app", "--port", str(port), "--log-level", "warning"],
+        cwd=workdir, env=env
+    )
+
+
+def wait_ready(base_url, timeout=60.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            response = httpx.get(f"{base_url}/api/ready", timeout=1.0)
+            if response.status_code == 200:
+                return response.json()
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.005)
+    raise RuntimeError("La aplicación no arrancó a tiempo")
+
+
+def stop_app(process):
+    # SIGINT para que uvicorn ejecute el apagado y guarde el estado
+    process.send_signal(signal.SIGINT)
+    process.wait(timeout=30)
+
+
+def populate(workdir, mock_url, docs, questions):
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    process = start_app(workdir, mock_url, port, warmup=False)
+    try:
+        wait_ready(base_url)
+        bots = []
+        with httpx.Client(base_url=base_url, timeout=60.0) as client:
+            for i in range(docs):
+                extension = [".pdf", ".docx", ".txt", ".csv"][i % 4]
+                content = docgen.make_document(extension, paragraphs=80, seed=i)
+                document_id = client.post(
+                    "/api/upload-document/", files={"document": (f"doc_{i}{extension}", content)}
+                ).json()["document_id"]
+                chatbot_id = client.post(
+                    "/api/chatbots/", json={"name": f"Bot {i}", "document_id": document_id}
+                ).json()["chatbot_id"]
+                bots.append((chatbot_id, document_id))
+            # Los primeros chatbots reciben más tráfico: serán los que se precalienten
+            for i in range(questions):
+                chatbot_id, document_id = bots[i % max(1, len(bots) // 4)]
+                client.post("/api/ask-question/", json={
+                    "question": docgen.FAQ_QUESTIONS[i % len(docgen.FAQ_QUESTIONS)],
+                    "document_id": document_id,
+                    "chatbot_id": chatbot_id
+                })
+        return bots[0]
+    finally:
+        stop_app(process)
+
+
+def measure(workdir, mock_url, bot, warmup, delay):
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    start = time.monotonic()
+    process = start_app(workdir, mock_url, port, warmup)
+    try:
+        wait_ready(base_url)
+        ready = time.monotonic() - start
+        if delay:
+            time.sleep(delay)
+        chatbot_id, document_id = bot
+        asked = time.monotonic()
+        response = httpx.post(f"{base_url}/api/ask-question/", timeout=60.0, json={
+            "question": docgen.FAQ_QUESTIONS[0],
+            "document_id": document_id,
+            "chatbot_id": chatbot_id
+        })
+        response.raise_for_status()
+        answered = time.monotonic() - start
+        first_question = time.monotonic() - asked
+        server = httpx.get(f"{base_url}/api/ready").json()["warmup"]
+        return ready, answered, first_question, server
+    finally:
+        stop_app(process)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark de arranque en frío")
+    parser.add_argument("--docs", type=int, default=40)
+    parser.add_argument("--questions", type=int, default=80)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--delay", type=float, default=0.0, help="Espera (s) entre /api/ready y la primera pregunta")
+    parser.add_argument("--latency", type=float, default=0.05)
+    options = parser.parse_args(argv)
+
+    mock = MockServer(MockConfig(latency=options.latency, jitter=0.0), port=free_port()).start()
+    try:
+        with tempfile.TemporaryDirectory(prefix="docchat-cold-") as workdir:
+            bot = populate(workdir, mock.url, options.docs, options.questions)
+            print(f"{'precalentamiento':<17} {'listo ms':>9} {'1ª respuesta ms':>16} "
+                  f"{'1ª pregunta ms':>15} {'docs precargados':>17}")
+            for warmup in (False, True):
+                ready_times, answer_times, question_times, warmed = [], [], [], []
+                for _ in range(options.runs):
+                    ready, answered, first_question, server = measure(workdir, mock.url, bot, warmup, options.delay)
+                    ready_times.append(ready * 1000)
+                    answer_times.append(answered * 1000)
+                    question_times.append(first_question * 1000)
+                    warmed.append(server["documents_warmed"])
+                print(f"{'sí' if warmup else 'no':<17} {statistics.median(ready_times):>9.1f} "
+                      f"{statistics.median(answer_times):>16.1f} {statistics.median(question_times):>15.1f} "
+                      f"{max(warmed):>17}")
+    finally:
+        mock.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+# bench/conversation_retrieval.py
+"""Recuperación en conversaciones de varios turnos.
+
+Cada conversación pregunta por un producto y sigue con preguntas de
+seguimiento sin palabras clave propias ("¿Y el precio?"). Se compara la
+recuperación solo con la pregunta, con la consulta reescrita a partir del
+historial y con la reescritura más la caché de chunks por sesión. Un turno
+acierta si alguno de los chunks elegidos contiene la frase del producto:
+
+    python -m bench.conversation_retrieval --paragraphs 400 --conversations 200
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from bench import docgen
+
+CONVERSATIONS = [
+    ["¿Qué garantía tiene el producto {product}?", "¿Y el precio?", "¿Eso incluye el envío?"],
+    ["¿Cuánto cuesta el producto {product}?", "¿Y la garantía?", "¿Cuántos años?"],
+    ["Háblame del producto {product}", "¿Qué precio tiene?", "¿Y cuánto dura la garantía?"],
+]
+
+
+def run(app, document, conversations, rewrite, sessions):
+    app.QUERY_REWRITE_ENABLED = rewrite
+    app.sessions = app.SessionCache()
+    before = dict(app.metrics)
+    hits = follow_ups = words = 0
+    elapsed = 0.0
+    for number, (product, turns) in enumerate(conversations):
+        history = []
+        target = f"producto {product} tiene un precio"
+        for position, template in enumerate(turns):
+            question = template.format(product=product)
+            start = time.perf_counter()
+            chunk_ids = app.select_turn_context(document, "bench", question, history,
+                                                f"s{number}" if sessions else None)
+            elapsed += time.perf_counter() - start
+            chunks = [app.format_chunk(document, i) for i in chunk_ids]
+            words += sum(len(chunk.split()) for chunk in chunks)
+            if position > 0:
+                follow_ups += 1
+                hits += any(target in chunk for chunk in chunks)
+            history.append({"question": question, "answer": "..."})
+    turns = sum(len(turns) for _, turns in conversations)
+    return {
+        "hit_rate": hits / follow_ups,
+        "searches": turns - (app.metrics["session_reuses"] - before["session_reuses"]),
+        "ms": elapsed * 1000,
+        "words": words / turns
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark de recuperación en conversaciones")
+    parser.add_argument("--paragraphs", type=int, default=400)
+    parser.add_argument("--conversations", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=5)
+    options = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory(prefix="docchat-conversation-") as workdir:
+        os.chdir(workdir)
+        import app
+        file_path = os.path.join(workdir, "doc.txt")
+        with open(file_path, "wb") as f:
+            f.write(docgen.make_txt(options.paragraphs, options.seed))
+        document = app.DocumentRecord("doc.txt", file_path, **app.ingest_document(file_path))
+        app.get_lexical_index(document)
+
+        text = docgen.generate_text(options.paragraphs, options.seed)
+        products = [product for product in docgen.PRODUCTS if f"producto {product} tiene" in text]
+        rng = random.Random(options.seed)
+        conversations = [(rng.choice(products), rng.choice(CONVERSATIONS)) for _ in range(options.conversations)]
+
+        print(f"{'modo':<28} {'aciertos':>9} {'búsquedas':>10} {'ms':>8} {'palabras/turno':>15}")
+        for label, rewrite, sessions in (("solo la pregunta", False, False),
+                                         ("consulta reescrita", True, False),
+                                         ("reescrita + caché de sesión", True, True)):
+            result = run(app, document, conversations, rewrite, sessions)
+            print(f"{label:<28} {result['hit_rate']:>8.1%} {result['searches']:>10} "
+                  f"{result['ms']:>8.1f} {result['words']:>15.0f}")
+
+
+if __name__ == "__main__":
+    main()
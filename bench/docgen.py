@@ -0,0 +1,197 @@
+# bench/docgen.py
+"""Generadores de documentos sintéticos (PDF, DOCX, TXT y CSV) para los benchmarks.
+
+Los documentos son deterministas para una semilla dada, de modo que dos
+ejecuciones del harness trabajan siempre sobre el mismo contenido.
+"""
+import io
+import random
+import zlib
+
+import docx
+
+WORDS = (
+    "documento servicio cliente producto precio horario envio garantia soporte "
+    "factura pedido cuenta acceso usuario contrato plazo entrega devolucion "
+    "politica privacidad datos oficina sucursal telefono correo consulta tarifa "
+    "plan mensual anual descuento promocion catalogo inventario proveedor "
+    "calidad atencion respuesta solicitud registro pago tarjeta transferencia"
+).split()
+
+PRODUCTS = ["Alfa", "Beta", "Gamma", "Delta", "Omega", "Sigma", "Kappa", "Zeta"]
+
+FAQ_QUESTIONS = [
+    "¿Cuál es el horario de atención?",
+    "¿Cuánto cuesta el producto Alfa?",
+    "¿Cuál es la política de devoluciones?",
+    "¿Cómo puedo contactar con soporte?",
+    "¿Cuánto tarda el envío?",
+    "¿Qué garantía tiene el producto Beta?",
+    "¿Aceptan pagos con tarjeta?",
+    "¿Dónde está la sucursal principal?",
+]
+
+
+def _sentence(rng):
+    words = [rng.choice(WORDS) for _ in range(rng.randint(8, 18))]
+    return " ".join(words).capitalize() + "."
+
+
+def generate_sections(paragraphs=40, seed=0):
+    # Devuelve [(titulo, [parrafos])] con algunos datos "de negocio" intercalados
+    rng = random.Random(seed)
+    sections = []
+    per_section = max(1, paragraphs // 5)
+    for index in range(0, paragraphs, per_section):
+        title = f"Sección {len(sections) + 1}: {rng.choice(WORDS).capitalize()}"
+        body = []
+        for _ in range(min(per_section, paragraphs - index)):
+            body.append(" ".join(_sentence(rng) for _ in range(rng.randint(3, 6))))
+        product = rng.choice(PRODUCTS)
+        body.append(f"El producto {product} tiene un precio de {rng.randint(10, 999)} euros "
+                    f"y una garantía de {rng.randint(1, 5)} años.")
+        sections.append((title, body))
+    return sections
+
+
+def generate_text(paragraphs=40, seed=0):
+    lines = []
+    for title, body in generate_sections(paragraphs, seed):
+        lines.append(title)
+        lines.append("")
+        for paragraph in body:
+            lines.append(paragraph)
+            lines.append("")
+    lines.append("El horario de atención es de lunes a viernes de 9:00 a 18:00.")
+    return "\n".join(lines)
+
+
+def make_txt(paragraphs=40, seed=0):
+    return generate_text(paragraphs, seed).encode("utf-8")
+
+
+def _pdf_escape(text):
+    text = text.encode("latin-1", errors="replace").decode("latin-1")
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def _wrap(text, width=90):
+    lines = []
+    for paragraph in text.split("\n"):
+        current = ""
+        for word in paragraph.split(" "):
+            if current and len(current) + len(word) + 1 > width:
+                lines.append(current)
+                current = word
+            else:
+                current = f"{current} {word}" if current else word
+        lines.append(current)
+    return lines
+
+
+def make_pdf(paragraphs=40, seed=0, lines_per_page=50, image_pages=0):
+    # PDF mínimo escrito a mano (Helvetica, una columna) que PyPDF2 sabe leer.
+    # image_pages añade páginas "escaneadas": solo una imagen en escala de grises
+    lines = _wrap(generate_text(paragraphs, seed))
+    pages = [lines[i:i + lines_per_page] for i in range(0, len(lines), lines_per_page)] or [[]]
+    rng = random.Random(seed)
+    for _ in range(image_pages):
+        pages.insert(rng.randint(0, len(pages)), None)
+
+    objects = []
+
+    def add(body):
+        objects.append(body)
+        return len(objects)
+
+    catalog_id = add(None)
+    pages_id = add(None)
+    font_id = add(b"<< /Type /Font /Subtype /Type1 /Name /F1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>")
+
+    page_ids = []
+    for page_lines in pages:
+        if page_lines is None:
+            pixels = zlib.compress(bytes(rng.getrandbits(8) for _ in range(300 * 400)))
+            image_id = add(
+                b"<< /Type /XObject /Subtype /Image /Width 300 /Height 400 /ColorSpace /DeviceGray "
+                b"/BitsPerComponent 8 /Filter /FlateDecode /Length %d >>\nstream\n" % len(pixels)
+                + pixels + b"\nendstream"
+            )
+            stream = b"q 595 0 0 842 0 0 cm /Im1 Do Q"
+            content_id = add(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+            page_ids.append(add(
+                b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 595 842] "
+                b"/Resources << /XObject << /Im1 %d 0 R >> >> /Contents %d 0 R >>" % (pages_id, image_id, content_id)
+            ))
+            continue
+        content = ["BT", "/F1 10 Tf", "12 TL", "50 800 Td"]
+        for line in page_lines:
+            content.append(f"({_pdf_escape(line)}) Tj T*")
+        content.append("ET")
+        stream = "\n".join(content).encode("latin-1")
+        content_id = add(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+        page_ids.append(add(
+            b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 595 842] "
+            b"/Resources << /Font << /F1 %d 0 R >> >> /Contents %d 0 R >>" % (pages_id, font_id, content_id)
+        ))
+
+    objects[catalog_id - 1] = b"<< /Type /Catalog /Pages %d 0 R >>" % pages_id
+    kids = b" ".join(b"%d 0 R" % page_id for page_id in page_ids)
+    objects[pages_id - 1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, len(page_ids))
+
+    out = io.BytesIO()
+    out.write(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(out.tell())
+        out.write(b"%d 0 obj\n" % number + body + b"\nendobj\n")
+    xref = out.tell()
+    out.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1))
+    for offset in offsets:
+        out.write(b"%010d 00000 n \n" % offset)
+    out.write(b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, catalog_id, xref))
+    return out.getvalue()
+
+
+def make_docx(paragraphs=40, seed=0, tables=True):
+    rng = random.Random(seed)
+    document = docx.Document()
+    for title, body in generate_sections(paragraphs, seed):
+        document.add_heading(title, level=2)
+        for paragraph in body:
+            document.add_paragraph(paragraph)
+        if tables:
+            table = document.add_table(rows=1, cols=3)
+            header = table.rows[0].cells
+            header[0].text, header[1].text, header[2].text = "Producto", "Precio", "Horario"
+            for product in rng.sample(PRODUCTS, 3):
+                row = table.add_row().cells
+                row[0].text = product
+                row[1].text = f"{rng.randint(10, 999)} euros"
+                row[2].text = f"{rng.randint(8, 10)}:00 - {rng.randint(17, 20)}:00"
+    out = io.BytesIO()
+    document.save(out)
+    return out.getvalue()
+
+
+def make_csv(paragraphs=40, seed=0):
+    # Catálogo de productos: `paragraphs` escala el número de filas
+    rng = random.Random(seed)
+    lines = ["Producto,Categoría,Precio,Stock,Descripción"]
+    for i in range(paragraphs * 5):
+        product = f"{rng.choice(PRODUCTS)} {i}"
+        description = _sentence(rng).replace(",", "")
+        lines.append(f"{product},{rng.choice(WORDS)},{rng.randint(10, 999)} euros,{rng.randint(0, 500)},{description}")
+    return "\n".join(lines).encode("utf-8")
+
+
+GENERATORS = {
+    ".pdf": make_pdf,
+    ".docx": make_docx,
+    ".txt": make_txt,
+    ".csv": make_csv,
+}
+
+
+def make_document(extension, paragraphs=40, seed=0):
+    return GENERATORS[extension](paragraphs=paragraphs, seed=seed)
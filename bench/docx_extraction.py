@@ -0,0 +1,60 @@
+# bench/docx_extraction.py
+"""Compara la extracción DOCX en streaming con la ruta anterior de python-docx.
+
+    python -m bench.docx_extraction --sizes 50 500 5000
+
+Para cada tamaño reporta tiempo, pico de memoria (tracemalloc) y caracteres
+extraídos; la ruta antigua solo leía doc.paragraphs y perdía las tablas.
+"""
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+
+import docx
+
+from bench import docgen
+from extractors.docx_stream import extract_docx_text
+
+
+def extract_python_docx(file_path):
+    # Ruta original de extract_text
+    doc = docx.Document(file_path)
+    return "\n".join([paragraph.text for paragraph in doc.paragraphs if paragraph.text])
+
+
+def measure(function, file_path, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        text = function(file_path)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    tracemalloc.start()
+    function(file_path)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best, peak, len(text)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark de extracción DOCX")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[50, 500, 2000], help="Párrafos por documento")
+    parser.add_argument("--repeat", type=int, default=3)
+    options = parser.parse_args(argv)
+
+    print(f"{'párrafos':>9} {'KB':>7} {'extractor':<12} {'ms':>9} {'pico KB':>9} {'chars':>9}")
+    with tempfile.TemporaryDirectory() as workdir:
+        for size in options.sizes:
+            file_path = os.path.join(workdir, f"bench_{size}.docx")
+            with open(file_path, "wb") as f:
+                f.write(docgen.make_docx(paragraphs=size, seed=size))
+            kilobytes = os.path.getsize(file_path) // 1024
+            for name, function in (("python-docx", extract_python_docx), ("streaming", extract_docx_text)):
+                seconds, peak, chars = measure(function, file_path, options.repeat)
+                print(f"{size:>9} {kilobytes:>7} {name:<12} {seconds * 1000:>9.1f} {peak // 1024:>9} {chars:>9}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+# bench/import_time.py
+"""Presupuesto de tiempo de importación de la aplicación (arranque de cada worker).
+
+Importa `app` en un intérprete nuevo con `-X importtime`, varias veces, y
+comprueba que:
+
+- el tiempo acumulado de `import app` (mediana) no supera el presupuesto;
+- ningún módulo que debe cargarse de forma diferida (PyPDF2, httpx, uvicorn,
+  extractores, perfilador...) se importa al arrancar.
+
+Termina con código 1 si se incumple alguna de las dos condiciones, de modo que
+puede usarse como comprobación en CI:
+
+    python -m bench.import_time --budget-ms 500 --runs 5
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Módulos que solo deben importarse al usar el formato o la función que los necesita
+DEFERRED_MODULES = (
+    "PyPDF2",
+    "docx",
+    "httpx",
+    "uvicorn",
+    "cProfile",
+    "pstats",
+    "profiling",
+    "extractors.docx_stream",
+    "extractors.csv_rows",
+    "extractors.sections",
+    "widget.build",
+)
+
+
+def parse_importtime(output):
+    # Líneas "import time: self [us] | cumulative | imported package"
+    modules = {}
+    for line in output.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        modules[name.strip()] = (int(self_us), int(cumulative_us))
+    return modules
+
+
+def import_profile(module, workdir):
+    # Directorio de trabajo vacío: importar no debe depender de (ni crear) archivos
+    env = dict(os.environ, PYTHONPATH=REPO_ROOT)
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=workdir, env=env, capture_output=True, text=True, check=True
+    )
+    return parse_importtime(result.stderr)
+
+
+def deferred_cost(workdir):
+    # Lo que costaría importar al arrancar los módulos diferidos que están instalados
+    available = []
+    for module in DEFERRED_MODULES:
+        try:
+            import_profile(module, workdir)
+            available.append(module)
+        except subprocess.CalledProcessError:
+            pass
+    if not available:
+        return 0
+    modules = import_profile(", ".join(available), workdir)
+    return sum(modules[module][1] for module in available if module in modules)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Presupuesto de tiempo de importación")
+    parser.add_argument("--module", default="app")
+    parser.add_argument("--budget-ms", type=float, default=float(os.environ.get("IMPORT_BUDGET_MS", "500")))
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10)
+    options = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory(prefix="docchat-import-") as workdir:
+        profiles = [import_profile(options.module, workdir) for _ in range(options.runs)]
+        created = sorted(os.listdir(workdir))
+        deferred_us = deferred_cost(workdir)
+
+    totals = [profile[options.module][1] / 1000 for profile in profiles]
+    total_ms = statistics.median(totals)
+    last = profiles[-1]
+
+    print(f"import {options.module}: mediana {total_ms:.1f} ms (mín {min(totals):.1f}, máx {max(totals):.1f}) "
+          f"presupuesto {options.budget_ms:.0f} ms")
+    print(f"módulos diferidos (no importados al arrancar): {deferred_us / 1000:.1f} ms")
+    print(f"\n{'módulo':<40} {'propio ms':>10} {'acumulado ms':>13}")
+    top = sorted(
+        ((name, times) for name, times in last.items() if "." not in name and name != options.module),
+        key=lambda item: item[1][1], reverse=True
+    )[:options.top]
+    for name, (self_us, cumulative_us) in top:
+        print(f"{name:<40} {self_us / 1000:>10.1f} {cumulative_us / 1000:>13.1f}")
+
+    failures = []
+    if total_ms > options.budget_ms:
+        failures.append(f"la importación tarda {total_ms:.1f} ms (presupuesto {options.budget_ms:.0f} ms)")
+    eager = [module for module in DEFERRED_MODULES if module in last]
+    if eager:
+        failures.append(f"módulos importados al arrancar que deberían ser diferidos: {', '.join(eager)}")
+    if created:
+        failures.append(f"importar la aplicación crea archivos o directorios: {', '.join(created)}")
+
+    if failures:
+        print()
+        for failure in failures:
+            print(f"FALLO: {failure}")
+        sys.exit(1)
+    print("\nOK")
+
+
+if __name__ == "__main__":
+    main()
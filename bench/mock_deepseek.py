@@ -0,0 +1,242 @@
+# bench/mock_deepseek.py
+"""Servidor simulado del endpoint chat-completions de Deepseek (y de un
+endpoint /v1/completions compatible con OpenAI que acepta varias prompts por
+llamada, como vLLM).
+
+Permite probar la aplicación bajo carga sin gastar créditos de la API real.
+Se puede lanzar solo:
+
+    python -m bench.mock_deepseek --port 9100 --latency 0.8 --error-rate 0.02
+
+y apuntar la aplicación a él con DEEPSEEK_API_URL=http://127.0.0.1:9100/v1/chat/completions
+"""
+import argparse
+import asyncio
+import json
+import random
+import threading
+import time
+from dataclasses import dataclass
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+import uvicorn
+
+
+@dataclass
+class MockConfig:
+    latency: float = 0.5          # segundos hasta la respuesta (o el primer token)
+    jitter: float = 0.1           # variación uniforme +/- sobre la latencia
+    token_latency: float = 0.005  # segundos entre tokens en modo streaming
+    error_rate: float = 0.0       # fracción de peticiones que fallan
+    error_status: int = 500       # código devuelto en los fallos simulados
+    answer_tokens: int = 60       # longitud de la respuesta generada
+    max_concurrent: int = 0       # llamadas atendidas a la vez (0 = sin límite)
+    seed: int = None
+
+
+def _count_tokens(text):
+    # Aproximación barata: una palabra ~ un token
+    return len(text.split())
+
+
+def create_app(config=None):
+    config = config or MockConfig()
+    rng = random.Random(config.seed)
+    mock = FastAPI(title="Deepseek simulado")
+    mock.state.config = config
+    mock.state.requests = 0
+    mock.state.prompts = 0
+    mock.state.slots = None
+
+    def delay():
+        return max(0.0, config.latency + rng.uniform(-config.jitter, config.jitter))
+
+    async def wait_turn():
+        # Con max_concurrent se simula un servidor con capacidad limitada
+        if not config.max_concurrent:
+            await asyncio.sleep(delay())
+            return
+        # El semáforo se crea dentro del event loop del servidor
+        if mock.state.slots is None:
+            mock.state.slots = asyncio.Semaphore(config.max_concurrent)
+        async with mock.state.slots:
+            await asyncio.sleep(delay())
+
+    def build_answer(messages):
+        question = messages[-1]["content"] if messages else ""
+        words = question.split()[-8:] or ["respuesta"]
+        body = []
+        while len(body) < config.answer_tokens:
+            body.extend(words)
+        return " ".join(body[:config.answer_tokens])
+
+    @mock.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        mock.state.requests += 1
+        mock.state.prompts += 1
+        payload = await request.json()
+        messages = payload.get("messages", [])
+        model = payload.get("model", "deepseek-chat")
+
+        if rng.random() < config.error_rate:
+            await wait_turn()
+            return JSONResponse(
+                status_code=config.error_status,
+                content={"error": {"message": "Error simulado", "type": "mock_error"}}
+            )
+
+        answer = build_answer(messages)
+        prompt_tokens = sum(_count_tokens(m.get("content", "")) for m in messages)
+        usage = {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": config.answer_tokens,
+            "total_tokens": prompt_tokens + config.answer_tokens
+        }
+        created = int(time.time())
+
+        if payload.get("stream"):
+            async def event_stream():
+                await asyncio.sleep(delay())
+                for token in answer.split(" "):
+                    chunk = {
+                        "id": "mock-stream",
+                        "object": "chat.completion.chunk",
+                        "created": created,
+                        "model": model,
+                        "choices": [{"index": 0, "delta": {"content": token + " "}, "finish_reason": None}]
+                    }
+                    yield f"data: {json.dumps(chunk)}\n\n"
+                    if config.token_latency:
+                        await asyncio.sleep(config.token_latency)
+                final = {
+                    "id": "mock-stream",
+                    "object": "chat.completion.chunk",
+                    "created": created,
+                    "model": model,
+                    "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+                    "usage": usage
+                }
+                yield f"data: {json.dumps(final)}\n\n"
+                yield "data: [DONE]\n\n"
+
+            return StreamingResponse(event_stream(), media_type="text/event-stream")
+
+        await wait_turn()
+        return {
+            "id": "mock-completion",
+            "object": "chat.completion",
+            "created": created,
+            "model": model,
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": answer}, "finish_reason": "stop"}],
+            "usage": usage
+        }
+
+    @mock.post("/v1/completions")
+    async def completions(request: Request):
+        # Varias prompts en una llamada: se generan juntas con una sola latencia
+        mock.state.requests += 1
+        payload = await request.json()
+        prompts = payload.get("prompt", "")
+        if isinstance(prompts, str):
+            prompts = [prompts]
+        mock.state.prompts += len(prompts)
+        model = payload.get("model", "mock-completions")
+
+        await wait_turn()
+        if rng.random() < config.error_rate:
+            return JSONResponse(
+                status_code=config.error_status,
+                content={"error": {"message": "Error simulado", "type": "mock_error"}}
+            )
+
+        choices = []
+        for index, prompt in enumerate(prompts):
+            question = prompt.rsplit("Pregunta: ", 1)[-1]
+            choices.append({
+                "index": index,
+                "text": build_answer([{"content": question}]),
+                "finish_reason": "stop"
+            })
+        prompt_tokens = sum(_count_tokens(prompt) for prompt in prompts)
+        completion_tokens = config.answer_tokens * len(prompts)
+        return {
+            "id": "mock-completion",
+            "object": "text_completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": choices,
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens
+            }
+        }
+
+    @mock.get("/stats")
+    async def stats():
+        return {"requests": mock.state.requests, "prompts": mock.state.prompts}
+
+    return mock
+
+
+class MockServer:
+    # Ejecuta el servidor simulado en un hilo para usarlo desde el harness
+    def __init__(self, config=None, host="127.0.0.1", port=9100):
+        self.app = create_app(config)
+        self.host = host
+        self.port = port
+        self._server = uvicorn.Server(uvicorn.Config(self.app, host=host, port=port, log_level="warning"))
+        self._thread = threading.Thread(target=self._server.run, daemon=True)
+
+    @property
+    def url(self):
+        return f"http://{self.host}:{self.port}/v1/chat/completions"
+
+    @property
+    def completions_url(self):
+        return f"http://{self.host}:{self.port}/v1/completions"
+
+    def start(self, timeout=10.0):
+        self._thread.start()
+        deadline = time.monotonic() + timeout
+        while not self._server.started:
+            if time.monotonic() > deadline:
+                raise RuntimeError("El servidor simulado no arrancó a tiempo")
+            time.sleep(0.02)
+        return self
+
+    def stop(self):
+        self._server.should_exit = True
+        self._thread.join(timeout=5.0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor Deepseek simulado")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--latency", type=float, default=0.5)
+    parser.add_argument("--jitter", type=float, default=0.1)
+    parser.add_argument("--token-latency", type=float, default=0.005)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--error-status", type=int, default=500)
+    parser.add_argument("--answer-tokens", type=int, default=60)
+    parser.add_argument("--max-concurrent", type=int, default=0)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    config = MockConfig(
+        latency=args.latency,
+        jitter=args.jitter,
+        token_latency=args.token_latency,
+        error_rate=args.error_rate,
+        error_status=args.error_status,
+        answer_tokens=args.answer_tokens,
+        max_concurrent=args.max_concurrent,
+        seed=args.seed
+    )
+    uvicorn.run(create_app(config), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
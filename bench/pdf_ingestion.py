@@ -0,0 +1,67 @@
+# bench/pdf_ingestion.py
+"""Extracción de PDF: ruta anterior (extract_text de PyPDF2 en todas las
+páginas) frente a extract_pdf_text con pre-análisis de páginas escaneadas y
+caché por hash de página, en tres situaciones: primera subida (caché vacía),
+misma subida repetida y nueva versión con una página modificada.
+
+    python -m bench.pdf_ingestion --paragraphs 400 --image-pages 20
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from PyPDF2 import PdfReader
+
+from bench import docgen
+from extractors.pdf_pages import PageTextCache, extract_pdf_text
+
+
+def legacy_extract(file_path):
+    text = ""
+    with open(file_path, "rb") as f:
+        for page in PdfReader(f).pages:
+            page_text = page.extract_text()
+            if page_text:
+                text += page_text + "\n"
+    return text
+
+
+def timed(function):
+    start = time.perf_counter()
+    result = function()
+    return (time.perf_counter() - start) * 1000, result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark de extracción de PDF")
+    parser.add_argument("--paragraphs", type=int, default=400)
+    parser.add_argument("--image-pages", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=3)
+    options = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory(prefix="docchat-pdf-") as workdir:
+        original = os.path.join(workdir, "original.pdf")
+        with open(original, "wb") as f:
+            f.write(docgen.make_pdf(options.paragraphs, options.seed, image_pages=options.image_pages))
+        # Nueva versión: una frase cambiada (misma longitud, la tabla xref sigue siendo válida)
+        edited = os.path.join(workdir, "edited.pdf")
+        with open(edited, "wb") as f:
+            f.write(docgen.make_pdf(options.paragraphs, options.seed, image_pages=options.image_pages)
+                    .replace(b"(El horario", b"(Al horario", 1))
+
+        cache = PageTextCache(os.path.join(workdir, "cache"))
+        legacy_ms, legacy_text = timed(lambda: legacy_extract(original))
+        print(f"{'caso':<22} {'ms':>9} {'páginas':>8} {'extraídas':>10} {'caché':>6} {'escaneadas':>11}")
+        print(f"{'anterior':<22} {legacy_ms:>9.1f} {'-':>8} {'-':>10} {'-':>6} {'-':>11}")
+        for label, file_path in (("primera subida", original), ("subida repetida", original), ("versión editada", edited)):
+            stats = {}
+            elapsed, text = timed(lambda: extract_pdf_text(file_path, cache=cache, stats=stats))
+            if file_path == original and text != legacy_text:
+                raise RuntimeError("El texto extraído no coincide con la ruta anterior")
+            print(f"{label:<22} {elapsed:>9.1f} {stats['pages']:>8} {stats['pages_extracted']:>10} "
+                  f"{stats['cache_hits']:>6} {stats['image_pages']:>11}")
+
+
+if __name__ == "__main__":
+    main()
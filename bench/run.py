@@ -0,0 +1,184 @@
+# bench/run.py
+"""Harness de benchmark de la aplicación.
+
+Arranca el servidor Deepseek simulado, ejecuta los escenarios elegidos y
+reporta throughput y latencias p50/p95/p99 por endpoint:
+
+    python -m bench.run --scenario all --json resultados.json
+    python -m bench.run --scenario faq_widget --baseline resultados.json
+    python -m bench.run --scenario batch_eval --provider completions --mock-concurrency 4
+
+Por defecto la aplicación se ejecuta en proceso (ASGI). Con --target se mide
+un despliegue real; en ese caso la aplicación debe tener DEEPSEEK_API_URL
+apuntando al servidor simulado.
+"""
+import argparse
+import asyncio
+import importlib
+import json
+import os
+import sys
+import tempfile
+import time
+from collections import defaultdict
+
+import httpx
+
+from bench.mock_deepseek import MockConfig, MockServer
+from bench.scenarios import SCENARIOS
+from stats import percentile
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class Recorder:
+    def __init__(self):
+        self.samples = defaultdict(list)
+        self.errors = defaultdict(int)
+
+    def record(self, label, seconds, status_code):
+        self.samples[label].append(seconds)
+        if status_code >= 400:
+            self.errors[label] += 1
+
+    def summary(self, wall_time):
+        report = {}
+        for label, values in sorted(self.samples.items()):
+            ordered = sorted(values)
+            report[label] = {
+                "requests": len(ordered),
+                "errors": self.errors[label],
+                "throughput_rps": round(len(ordered) / wall_time, 2) if wall_time else 0.0,
+                "p50_ms": round(percentile(ordered, 0.50) * 1000, 2),
+                "p95_ms": round(percentile(ordered, 0.95) * 1000, 2),
+                "p99_ms": round(percentile(ordered, 0.99) * 1000, 2),
+            }
+        return report
+
+
+class BenchClient:
+    # Envoltorio de httpx que mide cada petición y la agrupa por endpoint
+    def __init__(self, client, recorder):
+        self.client = client
+        self.recorder = recorder
+
+    async def request(self, method, url, label=None, **kwargs):
+        label = label or f"{method} {url}"
+        start = time.perf_counter()
+        try:
+            response = await self.client.request(method, url, **kwargs)
+        except httpx.HTTPError:
+            self.recorder.record(label, time.perf_counter() - start, 599)
+            raise
+        self.recorder.record(label, time.perf_counter() - start, response.status_code)
+        return response
+
+
+def load_app(mock_url, provider="deepseek", completions_url=None, max_batch=16):
+    # La aplicación lee DEEPSEEK_API_URL al importarse y escribe en el
+    # directorio actual, así que se importa dentro de un directorio temporal
+    os.environ["DEEPSEEK_API_URL"] = mock_url
+    os.environ["LLM_PROVIDER"] = provider
+    if provider == "completions":
+        # Proveedor compatible con /v1/completions con agrupación de peticiones
+        os.environ["LLM_BACKENDS"] = json.dumps({"completions": {
+            "type": "completions", "url": completions_url, "model": "mock-completions",
+            "batch": True, "max_batch": max_batch, "max_wait_ms": 10
+        }})
+    # Sin límites de peticiones: todo el tráfico sale de la misma IP
+    for name in ("RATE_LIMIT_PER_CHATBOT", "RATE_LIMIT_PER_ORIGIN", "RATE_LIMIT_PER_IP"):
+        os.environ.setdefault(name, "0")
+    # El escenario batch_eval usa una ruta de administración
+    os.environ.setdefault("ADMIN_TOKEN", "bench")
+    workdir = tempfile.mkdtemp(prefix="docchat-bench-")
+    os.chdir(workdir)
+    if REPO_ROOT not in sys.path:
+        sys.path.insert(0, REPO_ROOT)
+    return importlib.import_module("app").app
+
+
+async def run_scenarios(names, options, target=None, app=None):
+    results = {}
+    for name in names:
+        recorder = Recorder()
+        if target:
+            transport = None
+            base_url = target
+        else:
+            transport = httpx.ASGITransport(app=app)
+            base_url = "http://bench"
+        async with httpx.AsyncClient(transport=transport, base_url=base_url, timeout=120.0) as client:
+            start = time.perf_counter()
+            await SCENARIOS[name](BenchClient(client, recorder), options)
+            wall_time = time.perf_counter() - start
+        results[name] = {"wall_time_s": round(wall_time, 3), "endpoints": recorder.summary(wall_time)}
+    return results
+
+
+def print_report(results, baseline=None):
+    for name, result in results.items():
+        print(f"\n== {name} ({result['wall_time_s']} s)")
+        print(f"{'endpoint':<32} {'reqs':>6} {'err':>5} {'rps':>8} {'p50':>9} {'p95':>9} {'p99':>9}")
+        for label, stats in result["endpoints"].items():
+            line = (f"{label:<32} {stats['requests']:>6} {stats['errors']:>5} {stats['throughput_rps']:>8} "
+                    f"{stats['p50_ms']:>9} {stats['p95_ms']:>9} {stats['p99_ms']:>9}")
+            previous = (baseline or {}).get(name, {}).get("endpoints", {}).get(label)
+            if previous and previous["p95_ms"]:
+                delta = (stats["p95_ms"] - previous["p95_ms"]) / previous["p95_ms"] * 100
+                line += f"   p95 {delta:+.1f}% vs base"
+            print(line)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark de DocumentChat")
+    parser.add_argument("--scenario", default="all", choices=["all"] + list(SCENARIOS))
+    parser.add_argument("--target", default=None, help="URL base de un despliegue a medir (por defecto, en proceso)")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--uploads", type=int, default=60)
+    parser.add_argument("--questions", type=int, default=200)
+    parser.add_argument("--sessions", type=int, default=8)
+    parser.add_argument("--turns", type=int, default=20)
+    parser.add_argument("--batch-size", type=int, default=50, help="Preguntas del escenario batch_eval")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--mock-port", type=int, default=9100)
+    parser.add_argument("--latency", type=float, default=0.3, help="Latencia simulada de Deepseek (s)")
+    parser.add_argument("--jitter", type=float, default=0.05)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--mock-concurrency", type=int, default=0, help="Llamadas simultáneas que atiende el simulador")
+    parser.add_argument("--provider", default="deepseek", choices=["deepseek", "completions", "local"],
+                        help="Backend de la aplicación (completions agrupa peticiones concurrentes)")
+    parser.add_argument("--max-batch", type=int, default=16)
+    parser.add_argument("--json", dest="json_path", default=None, help="Guardar resultados en JSON")
+    parser.add_argument("--baseline", default=None, help="JSON de una ejecución anterior para comparar")
+    options = parser.parse_args(argv)
+    # load_app cambia de directorio: resolver las rutas antes
+    if options.json_path:
+        options.json_path = os.path.abspath(options.json_path)
+    if options.baseline:
+        options.baseline = os.path.abspath(options.baseline)
+
+    names = list(SCENARIOS) if options.scenario == "all" else [options.scenario]
+    mock = MockServer(
+        MockConfig(latency=options.latency, jitter=options.jitter, error_rate=options.error_rate,
+                   max_concurrent=options.mock_concurrency, seed=options.seed),
+        port=options.mock_port
+    ).start()
+    try:
+        app = None if options.target else load_app(mock.url, options.provider, mock.completions_url, options.max_batch)
+        results = asyncio.run(run_scenarios(names, options, target=options.target, app=app))
+    finally:
+        mock.stop()
+
+    baseline = None
+    if options.baseline:
+        with open(options.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+    print_report(results, baseline)
+
+    if options.json_path:
+        with open(options.json_path, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+# bench/scenarios.py
+"""Escenarios de carga guionizados.
+
+Cada escenario recibe un BenchClient (que mide cada petición) y un objeto de
+opciones, y genera tráfico realista contra la aplicación.
+"""
+import asyncio
+import itertools
+import json
+import os
+import random
+
+from bench import docgen
+
+
+async def _gather_limited(concurrency, coroutines):
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run(coroutine):
+        async with semaphore:
+            return await coroutine
+
+    return await asyncio.gather(*(run(c) for c in coroutines))
+
+
+async def _upload(client, extension, paragraphs, seed):
+    content = docgen.make_document(extension, paragraphs=paragraphs, seed=seed)
+    response = await client.request(
+        "POST", "/api/upload-document/",
+        files={"document": (f"bench_{seed}{extension}", content)}
+    )
+    if response.status_code != 200:
+        return None
+    return response.json()["document_id"]
+
+
+async def _create_chatbot(client, document_id, name):
+    response = await client.request("POST", "/api/chatbots/", json={"name": name, "document_id": document_id})
+    if response.status_code != 200:
+        return None
+    return response.json()["chatbot_id"]
+
+
+async def upload_storm(client, options):
+    # Muchas subidas concurrentes de documentos de formatos y tamaños mezclados
+    extensions = itertools.cycle([".pdf", ".docx", ".txt"])
+    rng = random.Random(options.seed)
+    jobs = [
+        _upload(client, next(extensions), rng.choice([10, 40, 160]), options.seed + i)
+        for i in range(options.uploads)
+    ]
+    await _gather_limited(options.concurrency, jobs)
+
+
+async def faq_widget(client, options):
+    # Tráfico típico del widget: carga del script y preguntas frecuentes repetidas
+    rng = random.Random(options.seed)
+    chatbot_ids = []
+    for i, extension in enumerate([".pdf", ".docx", ".txt"]):
+        document_id = await _upload(client, extension, 40, options.seed + i)
+        if document_id:
+            chatbot_id = await _create_chatbot(client, document_id, f"FAQ {extension}")
+            if chatbot_id:
+                chatbot_ids.append((chatbot_id, document_id))
+    if not chatbot_ids:
+        raise RuntimeError("No se pudo preparar ningún chatbot para el escenario FAQ")
+
+    async def visit():
+        chatbot_id, document_id = rng.choice(chatbot_ids)
+        await client.request("GET", f"/api/widget/{chatbot_id}.js", label="GET /api/widget/{id}.js")
+        for _ in range(rng.randint(1, 3)):
+            await client.request("POST", "/api/ask-question/", json={
+                "question": rng.choice(docgen.FAQ_QUESTIONS),
+                "document_id": document_id,
+                "chatbot_id": chatbot_id,
+                "chat_history": []
+            })
+
+    async def dashboard():
+        await client.request("GET", "/api/chatbots")
+
+    jobs = [visit() for _ in range(options.questions)]
+    jobs += [dashboard() for _ in range(max(1, options.questions // 10))]
+    rng.shuffle(jobs)
+    await _gather_limited(options.concurrency, jobs)
+
+
+async def long_conversation(client, options):
+    # Sesiones con historial creciente para medir el coste de conversaciones largas
+    rng = random.Random(options.seed)
+    document_id = await _upload(client, ".txt", 160, options.seed)
+    if not document_id:
+        raise RuntimeError("No se pudo subir el documento para el escenario de conversación")
+
+    async def session():
+        history = []
+        for _ in range(options.turns):
+            question = rng.choice(docgen.FAQ_QUESTIONS)
+            response = await client.request("POST", "/api/ask-question/", json={
+                "question": question,
+                "document_id": document_id,
+                "chat_history": history
+            })
+            if response.status_code != 200:
+                break
+            history.append({"question": question, "answer": response.json()["answer"]})
+            history = history[-10:]
+
+    await _gather_limited(options.concurrency, [session() for _ in range(options.sessions)])
+
+
+async def batch_eval(client, options):
+    # Validar un documento con un juego de preguntas: una a una frente a un lote NDJSON
+    rng = random.Random(options.seed)
+    document_id = await _upload(client, ".txt", 160, options.seed)
+    if not document_id:
+        raise RuntimeError("No se pudo subir el documento para el escenario de lote")
+    questions = [rng.choice(docgen.FAQ_QUESTIONS) for _ in range(options.batch_size)]
+
+    for question in questions:
+        await client.request("POST", "/api/ask-question/", label="POST /api/ask-question/ (en serie)", json={
+            "question": question,
+            "document_id": document_id
+        })
+
+    # Con --target, el token de administración del despliegue va en ADMIN_TOKEN
+    response = await client.request("POST", "/api/ask-batch/", headers={
+        "x-admin-token": os.environ.get("ADMIN_TOKEN", "")
+    }, json={
+        "questions": questions,
+        "document_id": document_id,
+        "concurrency": options.concurrency
+    })
+    lines = response.text.splitlines()
+    if response.status_code != 200 or not lines or "summary" not in json.loads(lines[-1]):
+        raise RuntimeError("El lote no terminó con una línea de resumen")
+
+
+SCENARIOS = {
+    "upload_storm": upload_storm,
+    "faq_widget": faq_widget,
+    "long_conversation": long_conversation,
+    "batch_eval": batch_eval,
+}
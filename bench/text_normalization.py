@@ -0,0 +1,73 @@
+# bench/text_normalization.py
+"""Compara la ruta anterior (process_text con dos re.sub + chunk_text) con la
+normalización en streaming que conserva la estructura.
+
+    python -m bench.text_normalization --sizes 100 1000 10000
+"""
+import argparse
+import os
+import re
+import tempfile
+import time
+
+from bench import docgen
+from extractors.sections import chunk_structured_file
+
+
+def legacy_chunks(file_path, chunk_size=1000, overlap=100):
+    # Ruta original: leer todo, aplanar espacios y trocear por caracteres
+    with open(file_path, "r", encoding="utf-8", errors="ignore") as f:
+        text = f.read()
+    text = re.sub(r'\n\s*\n', '\n\n', text)
+    text = re.sub(r'\s+', ' ', text).strip()
+    chunks = []
+    start = 0
+    while start < len(text):
+        end = min(start + chunk_size, len(text))
+        if end < len(text):
+            boundary = text.rfind(" ", start + overlap + 1, end)
+            if boundary != -1:
+                end = boundary
+        chunks.append(text[start:end])
+        if end >= len(text):
+            break
+        start = end - overlap
+    return chunks
+
+
+def best_of(function, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark de normalización de texto")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000], help="Párrafos por documento")
+    parser.add_argument("--repeat", type=int, default=3)
+    options = parser.parse_args(argv)
+
+    print(f"{'párrafos':>9} {'KB':>7} {'ruta':<12} {'ms':>9} {'chunks':>7} {'con sección':>12}")
+    with tempfile.TemporaryDirectory() as workdir:
+        for size in options.sizes:
+            file_path = os.path.join(workdir, f"bench_{size}.txt")
+            with open(file_path, "wb") as f:
+                f.write(docgen.make_txt(paragraphs=size, seed=size))
+            kilobytes = os.path.getsize(file_path) // 1024
+
+            seconds, chunks = best_of(lambda: legacy_chunks(file_path), options.repeat)
+            print(f"{size:>9} {kilobytes:>7} {'anterior':<12} {seconds * 1000:>9.1f} {len(chunks):>7} {0:>12}")
+
+            seconds, (chunks, sections) = best_of(
+                lambda: chunk_structured_file(file_path, markdown=False), options.repeat
+            )
+            titled = sum(1 for section in sections if section)
+            print(f"{size:>9} {kilobytes:>7} {'estructurada':<12} {seconds * 1000:>9.1f} {len(chunks):>7} {titled:>12}")
+
+
+if __name__ == "__main__":
+    main()
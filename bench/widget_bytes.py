@@ -0,0 +1,87 @@
+# bench/widget_bytes.py
+"""Bytes transferidos por vista de página con el widget incrustado.
+
+El widget anterior era un único script por chatbot de 12277 bytes, sin
+minificar, sin comprimir y sin cabeceras de caché, así que se descargaba
+entero en cada vista. Ahora cada vista descarga un script de arranque pequeño
+(cacheable unos minutos) y, solo la primera vez, el bundle común con gzip y
+caché "immutable":
+
+    python -m bench.widget_bytes --views 20 --widgets 2
+"""
+import argparse
+import asyncio
+import os
+import re
+import tempfile
+
+import httpx
+
+from bench import docgen
+
+LEGACY_SCRIPT_BYTES = 12277
+
+
+async def page_view(client, chatbot_ids, browser_cache):
+    # Descarga lo que un navegador con caché HTTP pediría en una vista:
+    # los scripts de arranque (si caducaron) y el bundle (si no está en caché)
+    transferred = 0
+    for chatbot_id in chatbot_ids:
+        path = f"/api/widget/{chatbot_id}.js"
+        if path not in browser_cache:
+            response = await client.get(path, headers={"accept-encoding": "gzip"})
+            transferred += len(response.content)
+            browser_cache[path] = response.text
+        bundle_path = "/" + re.search(r's\.src="[a-z]+://[^/]+/([^"]+)"', browser_cache[path]).group(1)
+        if bundle_path not in browser_cache:
+            response = await client.get(bundle_path, headers={"accept-encoding": "gzip"})
+            transferred += int(response.headers["content-length"])
+            browser_cache[bundle_path] = response.headers["cache-control"]
+    return transferred
+
+
+async def run(views, widgets):
+    import app
+    transport = httpx.ASGITransport(app=app.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        response = await client.post("/api/upload-document/", files={
+            "document": ("doc.txt", docgen.make_document(".txt", 20, seed=1))
+        })
+        document_id = response.json()["document_id"]
+        chatbot_ids = []
+        for i in range(widgets):
+            response = await client.post("/api/chatbots/", json={"name": f"bot {i}", "document_id": document_id})
+            chatbot_ids.append(response.json()["chatbot_id"])
+
+        browser_cache = {}
+        first = await page_view(client, chatbot_ids, browser_cache)
+        cached = await page_view(client, chatbot_ids, browser_cache)
+        # Vistas posteriores con el script de arranque caducado (el bundle sigue en caché)
+        expired = 0
+        for _ in range(views - 1):
+            for path in [path for path in browser_cache if path.startswith("/api/widget/")]:
+                del browser_cache[path]
+            expired += await page_view(client, chatbot_ids, browser_cache)
+        expired //= max(views - 1, 1)
+
+    legacy = LEGACY_SCRIPT_BYTES * widgets
+    total = first + expired * (views - 1)
+    print(f"{'vista':<34} {'anterior':>9} {'ahora':>7} {'reducción':>10}")
+    for label, now in (("primera", first), ("repetida (arranque en caché)", cached),
+                       ("repetida (arranque caducado)", expired), (f"media de {views} vistas", total / views)):
+        reduction = f"{legacy / now:.1f}x" if now else "-"
+        print(f"{label:<34} {legacy:>9} {now:>7.0f} {reduction:>10}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bytes del widget por vista de página")
+    parser.add_argument("--views", type=int, default=20)
+    parser.add_argument("--widgets", type=int, default=1)
+    options = parser.parse_args(argv)
+    with tempfile.TemporaryDirectory(prefix="docchat-widget-") as workdir:
+        os.chdir(workdir)
+        asyncio.run(run(options.views, options.widgets))
+
+
+if __name__ == "__main__":
+    main()
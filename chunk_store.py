@@ -0,0 +1,281 @@
+# chunk_store.py
+# Almacenamiento compacto de documentos: un único buffer UTF-8 por documento
+# más un array de offsets. Los chunks se construyen bajo demanda a partir de
+# vistas del buffer, así que el solapamiento entre chunks no se duplica.
+# Cada documento se guarda en disco en un archivo que se abre con mmap, de
+# modo que restaurarlo tras un reinicio no obliga a leerlo entero.
+import json
+import mmap
+import os
+import struct
+import threading
+from array import array
+from collections import OrderedDict
+
+FILE_MAGIC = b"DCHK1"
+_HEADER_SIZE = struct.Struct("<I")
+
+
+def _char_boundary(buffer, position):
+    # Retroceder hasta el inicio de un carácter UTF-8
+    while position > 0 and (buffer[position] & 0xC0) == 0x80:
+        position -= 1
+    return position
+
+
+class ChunkStore:
+    __slots__ = ("buffer", "offsets", "prefix", "section_ids", "sections")
+
+    def __init__(self, buffer, offsets, prefix=b"", section_ids=None, sections=None):
+        self.buffer = buffer            # bytes UTF-8 con el texto del documento
+        self.offsets = offsets          # array('I'): inicio y fin de cada chunk en el buffer
+        self.prefix = prefix            # texto común a todos los chunks (cabecera de CSV)
+        self.section_ids = section_ids  # array('H'|'I') con el índice de sección de cada chunk
+        self.sections = sections        # títulos de sección únicos
+
+    @classmethod
+    def from_text(cls, text, chunk_size=1000, overlap=100):
+        # Chunks solapados sobre un texto continuo: solo se guardan los offsets
+        buffer = text.encode("utf-8")
+        offsets = array("I")
+        length = len(buffer)
+        start = 0
+        while start < length:
+            end = min(start + chunk_size, length)
+            # Ajustar final para no cortar en medio de una palabra
+            if end < length:
+                boundary = buffer.rfind(b" ", start + overlap + 1, end)
+                end = boundary if boundary != -1 else _char_boundary(buffer, end)
+            offsets.append(start)
+            offsets.append(end)
+            if end >= length:
+                break
+            start = _char_boundary(buffer, max(end - overlap, start + 1))
+            # Empezar el siguiente chunk en un inicio de palabra
+            space = buffer.find(b" ", start, end)
+            if space != -1:
+                start = space + 1
+        return cls(buffer, offsets)
+
+    @classmethod
+    def from_chunks(cls, chunks, sections=None, prefix=""):
+        # Chunks ya delimitados (secciones, filas de CSV) concatenados en un buffer
+        parts = []
+        offsets = array("I")
+        position = 0
+        for chunk in chunks:
+            encoded = chunk.encode("utf-8")
+            parts.append(encoded)
+            offsets.append(position)
+            position += len(encoded)
+            offsets.append(position)
+
+        section_ids = titles = None
+        if sections is not None and any(sections):
+            titles = []
+            known = {}
+            for section in sections:
+                if section not in known:
+                    known[section] = len(titles)
+                    titles.append(section)
+            section_ids = array("H" if len(titles) < 1 << 16 else "I", (known[s] for s in sections))
+
+        return cls(b"".join(parts), offsets, prefix.encode("utf-8"), section_ids, titles)
+
+    def __len__(self):
+        return len(self.offsets) // 2
+
+    def __getitem__(self, index):
+        return self.chunk(index)
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self.chunk(index)
+
+    def view(self, index):
+        # Vista sin copia del chunk dentro del buffer
+        return memoryview(self.buffer)[self.offsets[2 * index]:self.offsets[2 * index + 1]]
+
+    def chunk(self, index):
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("chunk fuera de rango")
+        text = str(self.view(index), "utf-8")
+        if self.prefix:
+            return f"{self.prefix.decode('utf-8')}\n{text}"
+        return text
+
+    def section(self, index):
+        if self.section_ids is None:
+            return ""
+        return self.sections[self.section_ids[index]]
+
+    def nbytes(self):
+        total = len(self.buffer) + len(self.prefix) + self.offsets.itemsize * len(self.offsets)
+        if self.section_ids is not None:
+            total += self.section_ids.itemsize * len(self.section_ids)
+            total += sum(len(title) for title in self.sections)
+        return total
+
+
+class DocumentRecord:
+    __slots__ = ("filename", "path", "store", "column_index", "lexical_index")
+
+    def __init__(self, filename, path, store, column_index=None):
+        self.filename = filename
+        self.path = path
+        self.store = store
+        self.column_index = column_index
+        self.lexical_index = None  # retrieval.LexicalIndex, se construye en la primera consulta
+
+
+def save_document(file_path, record):
+    # Formato: magia | longitud de cabecera | cabecera JSON | offsets | ids de sección | buffer
+    store = record.store
+    section_ids = store.section_ids
+    header = {
+        "filename": record.filename,
+        "path": record.path,
+        "prefix": store.prefix.decode("utf-8"),
+        "offsets": len(store.offsets),
+        "sections": store.sections,
+        "section_typecode": section_ids.typecode if section_ids is not None else None,
+        "column_index": record.column_index.to_dict() if record.column_index is not None else None
+    }
+    encoded = json.dumps(header, ensure_ascii=False).encode("utf-8")
+    temporary = f"{file_path}.tmp"
+    with open(temporary, "wb") as f:
+        f.write(FILE_MAGIC)
+        f.write(_HEADER_SIZE.pack(len(encoded)))
+        f.write(encoded)
+        f.write(store.offsets.tobytes())
+        if section_ids is not None:
+            f.write(section_ids.tobytes())
+        f.write(store.buffer)
+    os.replace(temporary, file_path)
+
+
+def load_document(file_path, will_need=False):
+    # El buffer queda como vista sobre el mmap: las páginas se leen al usarse
+    with open(file_path, "rb") as f:
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    if mapped[:len(FILE_MAGIC)] != FILE_MAGIC:
+        mapped.close()
+        raise ValueError(f"Archivo de documento no válido: {file_path}")
+    if will_need and hasattr(mapped, "madvise"):
+        mapped.madvise(mmap.MADV_WILLNEED)
+
+    position = len(FILE_MAGIC)
+    (header_size,) = _HEADER_SIZE.unpack_from(mapped, position)
+    position += _HEADER_SIZE.size
+    header = json.loads(mapped[position:position + header_size].decode("utf-8"))
+    position += header_size
+
+    offsets = array("I")
+    offsets.frombytes(mapped[position:position + header["offsets"] * offsets.itemsize])
+    position += len(offsets) * offsets.itemsize
+
+    section_ids = None
+    if header["section_typecode"]:
+        section_ids = array(header["section_typecode"])
+        count = len(offsets) // 2
+        section_ids.frombytes(mapped[position:position + count * section_ids.itemsize])
+        position += count * section_ids.itemsize
+
+    store = ChunkStore(
+        memoryview(mapped)[position:],
+        offsets,
+        header["prefix"].encode("utf-8"),
+        section_ids,
+        header["sections"]
+    )
+    column_index = None
+    if header["column_index"]:
+        from extractors.csv_rows import ColumnIndex
+        column_index = ColumnIndex.from_dict(header["column_index"])
+    return DocumentRecord(header["filename"], header["path"], store, column_index)
+
+
+class DocumentCatalog:
+    # Diccionario de documentos respaldado en disco: al arrancar solo se lista
+    # el directorio y cada documento se carga (mmap) la primera vez que se usa.
+    # Los cargados (con su índice léxico) forman un LRU de max_loaded documentos
+    def __init__(self, directory, max_loaded=0):
+        self.directory = directory
+        self.max_loaded = max_loaded  # 0: sin límite
+        self._known = set()
+        self._loaded = OrderedDict()
+        self._lock = threading.Lock()  # también se carga desde hilos (asyncio.to_thread)
+
+    def _remember(self, document_id, record):
+        with self._lock:
+            self._loaded[document_id] = record
+            self._loaded.move_to_end(document_id)
+            while self.max_loaded and len(self._loaded) > self.max_loaded:
+                self._loaded.popitem(last=False)
+        return record
+
+    def _file(self, document_id):
+        return os.path.join(self.directory, f"{document_id}.chunks")
+
+    def scan(self):
+        if not os.path.isdir(self.directory):
+            return 0
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(".chunks"):
+                self._known.add(entry.name[:-len(".chunks")])
+        return len(self._known)
+
+    def __contains__(self, document_id):
+        return document_id in self._known
+
+    def __len__(self):
+        return len(self._known)
+
+    def __iter__(self):
+        return iter(list(self._known))
+
+    def __getitem__(self, document_id):
+        record = self._loaded.get(document_id)
+        if record is None:
+            if document_id not in self._known:
+                raise KeyError(document_id)
+            return self._remember(document_id, load_document(self._file(document_id)))
+        with self._lock:
+            if document_id in self._loaded:
+                self._loaded.move_to_end(document_id)
+        return record
+
+    def __setitem__(self, document_id, record):
+        os.makedirs(self.directory, exist_ok=True)
+        save_document(self._file(document_id), record)
+        self._known.add(document_id)
+        self._remember(document_id, record)
+
+    def get(self, document_id, default=None):
+        try:
+            return self[document_id]
+        except KeyError:
+            return default
+
+    def evict(self, document_id):
+        # Olvidar el documento; devuelve su archivo para que quien llama lo
+        # borre (las peticiones en curso conservan su vista del mmap)
+        self._known.discard(document_id)
+        with self._lock:
+            self._loaded.pop(document_id, None)
+        return self._file(document_id)
+
+    def is_loaded(self, document_id):
+        return document_id in self._loaded
+
+    @property
+    def loaded_count(self):
+        return len(self._loaded)
+
+    def warm(self, document_id):
+        # Cargar por adelantado pidiendo al sistema que lea ya las páginas
+        if document_id in self._known and document_id not in self._loaded:
+            return self._remember(document_id, load_document(self._file(document_id), will_need=True))
+        return self._loaded.get(document_id)
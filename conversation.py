@@ -0,0 +1,65 @@
+# conversation.py
+# Recuperación en conversaciones de varios turnos, sin llamadas al proveedor:
+# - rewrite_query completa una pregunta de seguimiento ("¿y el precio?") con
+#   los términos más distintivos de las preguntas anteriores del historial;
+# - SessionCache guarda por sesión y documento los chunks del último turno,
+#   para reutilizarlos si ya cubren la nueva consulta en vez de volver a buscar.
+import time
+from collections import OrderedDict
+
+from retrieval import tokenize
+
+MIN_OWN_TERMS = 2     # una pregunta con al menos estos términos del documento se entiende sola
+HISTORY_TURNS = 2     # turnos anteriores de los que se toman términos
+CARRY_TERMS = 3       # términos añadidos como máximo
+
+
+def rewrite_query(question, chat_history, index):
+    own = tokenize(question)
+    if len({term for term in own if term in index}) >= MIN_OWN_TERMS:
+        return question
+
+    carried = []
+    seen = set(own)
+    for entry in reversed(chat_history[-HISTORY_TURNS:]):
+        if not isinstance(entry, dict) or not isinstance(entry.get("question"), str):
+            continue
+        # Del turno más reciente al más antiguo; en cada uno, los términos más raros primero
+        terms = [term for term in dict.fromkeys(tokenize(entry["question"]))
+                 if term in index and term not in seen]
+        terms.sort(key=index.idf, reverse=True)
+        for term in terms[:CARRY_TERMS - len(carried)]:
+            carried.append(term)
+            seen.add(term)
+        if len(carried) >= CARRY_TERMS:
+            break
+    return f"{question} {' '.join(carried)}" if carried else question
+
+
+class SessionCache:
+    # LRU acotado: (sesión, documento) -> chunks recuperados en el último turno
+    def __init__(self, max_sessions=10000, ttl=1800):
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self._entries = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, session_id, document_id, now=None):
+        key = (session_id, document_id)
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        chunk_ids, updated = entry
+        if (now if now is not None else time.monotonic()) - updated > self.ttl:
+            del self._entries[key]
+            return None
+        return chunk_ids
+
+    def put(self, session_id, document_id, chunk_ids, now=None):
+        key = (session_id, document_id)
+        self._entries[key] = (list(chunk_ids), now if now is not None else time.monotonic())
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_sessions:
+            self._entries.popitem(last=False)
@@ -0,0 +1,51 @@
+# extractive.py
+# Respuestas extractivas sin llamar al proveedor: se puntúa cada frase de los
+# chunks recuperados según qué parte de la pregunta cubre (términos ponderados
+# por su IDF en el documento). Si la mejor frase supera el umbral de
+# confianza, se devuelve tal cual como respuesta.
+import re
+
+from retrieval import tokenize
+
+MIN_QUESTION_TERMS = 2
+MAX_ANSWER_CHARS = 400
+
+# Frases terminadas en . ! ? seguido de espacio, o en fin de línea (las filas de
+# un CSV son líneas). Un punto dentro de un número ("9.99", "1.500") no corta
+_SENTENCE_RE = re.compile(r"(?:[^.!?\n]|[.!?]+(?=\S))+(?:[.!?]+(?=\s|$)|$)", re.MULTILINE)
+
+
+def split_sentences(text):
+    for position, match in enumerate(_SENTENCE_RE.finditer(text)):
+        sentence = match.group().strip()
+        # Un chunk solapado puede empezar a mitad de frase
+        if not sentence or (position == 0 and sentence[0].islower()):
+            continue
+        yield sentence
+
+
+def extract_answer(question, chunks, idf):
+    # Devuelve (frase, confianza); confianza = IDF cubierto / IDF de la pregunta
+    terms = set(tokenize(question))
+    if len(terms) < MIN_QUESTION_TERMS:
+        return None, 0.0
+    weights = {term: idf(term) for term in terms}
+    total = sum(weights.values())
+    if not total:
+        return None, 0.0
+
+    best, best_score = None, 0.0
+    for chunk in chunks:
+        for sentence in split_sentences(chunk):
+            # Las preguntas del documento (FAQ) no son respuestas
+            if len(sentence) > MAX_ANSWER_CHARS or sentence.endswith("?") or sentence.startswith("¿"):
+                continue
+            words = set(tokenize(sentence))
+            # Un título sin puntuación que repite la pregunta no la responde
+            if words == terms and not sentence.endswith((".", "!")):
+                continue
+            score = sum(weight for term, weight in weights.items() if term in words)
+            # A igualdad de cobertura, la frase más corta (más directa)
+            if score > best_score or (score == best_score and best is not None and len(sentence) < len(best)):
+                best, best_score = sentence, score
+    return best, best_score / total
@@ -0,0 +1,2 @@
+# extractors/__init__.py
+# Extractores de texto especializados por formato de documento.
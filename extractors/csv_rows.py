@@ -0,0 +1,165 @@
+# extractors/csv_rows.py
+# Ingesta de CSV en streaming: lee filas una a una, agrupa chunks respetando
+# los límites de fila (repitiendo la cabecera en cada chunk) y, opcionalmente,
+# construye un índice de valores por columna para búsquedas exactas.
+import csv
+import math
+import re
+import unicodedata
+from collections import defaultdict
+
+CELL_SEPARATOR = " | "
+MAX_INDEXED_VALUE_CHARS = 80
+MAX_INDEXED_VALUE_WORDS = 6
+MAX_INDEX_ENTRIES = 200000
+
+# Valores demasiado comunes para identificar una fila
+STOPWORDS = frozenset(
+    "a al con de del el en es la las lo los no o para por que se si sin su un una y".split()
+)
+
+_TOKEN_RE = re.compile(r"\w+")
+
+csv.field_size_limit(1 << 24)
+
+
+def normalize_value(text):
+    # Minúsculas, sin acentos y con un solo espacio entre palabras
+    text = unicodedata.normalize("NFKD", text.lower())
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return " ".join(_TOKEN_RE.findall(text))
+
+
+class ColumnIndex:
+    # valor normalizado -> chunks que contienen alguna fila con ese valor
+    def __init__(self, columns):
+        self.columns = columns
+        self.values = defaultdict(list)
+        self.max_words = 1
+        self.chunk_count = 1
+
+    def add(self, value, chunk_id):
+        key = normalize_value(value)
+        if len(key) < 2 or key in STOPWORDS:
+            return
+        if len(self.values) >= MAX_INDEX_ENTRIES and key not in self.values:
+            return
+        words = key.count(" ") + 1
+        if words > MAX_INDEXED_VALUE_WORDS:
+            return
+        chunk_ids = self.values[key]
+        if not chunk_ids or chunk_ids[-1] != chunk_id:
+            chunk_ids.append(chunk_id)
+        self.max_words = max(self.max_words, words)
+
+    def to_dict(self):
+        return {
+            "columns": self.columns,
+            "values": self.values,
+            "max_words": self.max_words,
+            "chunk_count": self.chunk_count
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        index = cls(data["columns"])
+        index.values.update(data["values"])
+        index.max_words = data["max_words"]
+        index.chunk_count = data["chunk_count"]
+        return index
+
+    def lookup(self, question, limit=3):
+        # Busca los n-gramas de la pregunta en el índice: coste proporcional
+        # a la longitud de la pregunta, no al tamaño del documento
+        # Se prefieren las coincidencias más largas (cada palabra cuenta una
+        # sola vez) y los valores que aparecen en pocos chunks
+        tokens = normalize_value(question).split()
+        used = [False] * len(tokens)
+        scores = defaultdict(float)
+        for size in range(min(self.max_words, len(tokens)), 0, -1):
+            for start in range(len(tokens) - size + 1):
+                if any(used[start:start + size]):
+                    continue
+                chunk_ids = self.values.get(" ".join(tokens[start:start + size]))
+                if chunk_ids:
+                    used[start:start + size] = [True] * size
+                    weight = size * math.log(1 + self.chunk_count / len(chunk_ids))
+                    for chunk_id in chunk_ids:
+                        scores[chunk_id] += weight
+        ranked = sorted(scores, key=lambda chunk_id: (-scores[chunk_id], chunk_id))
+        return ranked[:limit]
+
+
+class CsvDocument:
+    # Los chunks se guardan sin la cabecera, que se antepone al leerlos
+    def __init__(self, header, bodies, index=None, rows=0):
+        self.header = header
+        self.header_line = CELL_SEPARATOR.join(header)
+        self.bodies = bodies
+        self.index = index
+        self.rows = rows
+
+    @property
+    def chunks(self):
+        return [f"{self.header_line}\n{body}" for body in self.bodies]
+
+
+def _open_reader(f):
+    sample = f.read(8192)
+    f.seek(0)
+    try:
+        dialect = csv.Sniffer().sniff(sample, delimiters=",;\t|")
+    except csv.Error:
+        dialect = csv.excel
+    return csv.reader(f, dialect)
+
+
+def iter_csv_rows(file_path):
+    # utf-8-sig: los CSV exportados desde Excel empiezan con BOM
+    with open(file_path, "r", encoding="utf-8-sig", errors="ignore", newline="") as f:
+        for row in _open_reader(f):
+            cells = [cell.strip() for cell in row]
+            if any(cells):
+                yield cells
+
+
+def chunk_csv(file_path, chunk_size=1000, build_index=True):
+    rows = iter_csv_rows(file_path)
+    header = next(rows, None)
+    if header is None:
+        return CsvDocument([], [])
+
+    header_line = CELL_SEPARATOR.join(header)
+    index = ColumnIndex(header) if build_index else None
+    chunks = []
+    current = []
+    current_size = len(header_line)
+    row_count = 0
+
+    def flush():
+        chunks.append("\n".join(current))
+
+    for cells in rows:
+        line = CELL_SEPARATOR.join(cells)
+        # Cortar solo entre filas; una fila enorme va sola en su chunk
+        if current and current_size + len(line) + 1 > chunk_size:
+            flush()
+            current = []
+            current_size = len(header_line)
+        current.append(line)
+        current_size += len(line) + 1
+        row_count += 1
+        if index is not None:
+            for cell in cells:
+                if cell and len(cell) <= MAX_INDEXED_VALUE_CHARS:
+                    index.add(cell, len(chunks))
+
+    if current or not chunks:
+        flush()
+    if index is not None:
+        index.chunk_count = len(chunks)
+    return CsvDocument(header, chunks, index, row_count)
+
+
+def extract_csv_text(file_path):
+    return "\n".join(CELL_SEPARATOR.join(cells) for cells in iter_csv_rows(file_path))
@@ -0,0 +1,113 @@
+# extractors/docx_stream.py
+# Extracción de DOCX en streaming: lee word/document.xml directamente del zip
+# con un parser XML incremental, emite párrafos y filas de tablas en el orden
+# del documento y libera cada bloque en cuanto se procesa (memoria acotada).
+import zipfile
+import xml.etree.ElementTree as ET
+
+W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+BODY = W + "body"
+PARAGRAPH = W + "p"
+TEXT = W + "t"
+TAB = W + "tab"
+BREAKS = (W + "br", W + "cr")
+TABLE = W + "tbl"
+ROW = W + "tr"
+CELL = W + "tc"
+
+CELL_SEPARATOR = " | "
+
+
+class _TableFrame:
+    __slots__ = ("row", "cell")
+
+    def __init__(self):
+        self.row = None
+        self.cell = None
+
+
+def iter_docx_blocks(file_path):
+    # Genera un texto por párrafo y una línea "a | b | c" por fila de tabla
+    try:
+        archive = zipfile.ZipFile(file_path)
+    except zipfile.BadZipFile:
+        raise ValueError("El archivo DOCX no es un zip válido")
+
+    with archive:
+        try:
+            stream = archive.open("word/document.xml")
+        except KeyError:
+            raise ValueError("El archivo DOCX no contiene word/document.xml")
+
+        with stream:
+            paragraphs = []   # pila de párrafos abiertos (los cuadros de texto anidan párrafos)
+            tables = []       # pila de tablas abiertas (las tablas pueden anidarse)
+            body = None
+            depth = 0
+            body_depth = None
+
+            for event, elem in ET.iterparse(stream, events=("start", "end")):
+                tag = elem.tag
+
+                if event == "start":
+                    depth += 1
+                    if tag == PARAGRAPH:
+                        paragraphs.append([])
+                    elif tag == TABLE:
+                        tables.append(_TableFrame())
+                    elif tag == ROW and tables:
+                        tables[-1].row = []
+                    elif tag == CELL and tables:
+                        tables[-1].cell = []
+                    elif tag == BODY:
+                        body = elem
+                        body_depth = depth
+                    continue
+
+                depth -= 1
+
+                if tag == TEXT:
+                    if paragraphs and elem.text:
+                        paragraphs[-1].append(elem.text)
+                elif tag == TAB:
+                    if paragraphs:
+                        paragraphs[-1].append("\t")
+                elif tag in BREAKS:
+                    if paragraphs:
+                        paragraphs[-1].append("\n")
+                elif tag == PARAGRAPH:
+                    text = "".join(paragraphs.pop()).strip()
+                    elem.clear()
+                    if text:
+                        if paragraphs:
+                            paragraphs[-1].append(" " + text)
+                        elif tables and tables[-1].cell is not None:
+                            tables[-1].cell.append(text)
+                        else:
+                            yield text
+                elif tag == CELL and tables:
+                    frame = tables[-1]
+                    if frame.row is not None:
+                        frame.row.append(" ".join(frame.cell or []))
+                    frame.cell = None
+                elif tag == ROW and tables:
+                    frame = tables[-1]
+                    cells = frame.row or []
+                    frame.row = None
+                    if any(cells):
+                        line = CELL_SEPARATOR.join(cells)
+                        if len(tables) > 1 and tables[-2].cell is not None:
+                            tables[-2].cell.append(line)
+                        else:
+                            yield line
+                    elem.clear()
+                elif tag == TABLE and tables:
+                    tables.pop()
+
+                # Liberar los bloques de primer nivel ya procesados
+                if body is not None and depth == body_depth:
+                    body.clear()
+
+
+def extract_docx_text(file_path):
+    return "\n".join(iter_docx_blocks(file_path))
@@ -0,0 +1,182 @@
+# extractors/pdf_pages.py
+# Extracción de PDF página a página con dos atajos:
+# - una caché en disco indexada por el hash del contenido de cada página
+#   (flujo de contenido + fuentes), para no volver a extraer páginas que ya se
+#   vieron en otra subida o en otra versión del documento;
+# - un pre-análisis barato del flujo de contenido que distingue páginas con
+#   texto de páginas solo con imágenes (escaneadas) o vacías, para no llamar a
+#   extract_text cuando no va a devolver nada.
+import hashlib
+import os
+import re
+import time
+
+from PyPDF2 import PdfReader
+
+TEXT = "text"
+IMAGE = "image"
+EMPTY = "empty"
+
+# Operadores de texto de PDF: BT ... ET delimitan un bloque de texto
+_TEXT_BLOCK_RE = re.compile(rb"(?:^|[\s\]>)])BT(?:[\s\[<(/]|$)")
+_DRAW_XOBJECT_RE = re.compile(rb"/([^\s/\[\]()<>{}%]+)\s+Do\b")
+
+# Claves que no influyen en el texto extraído (o que apuntan hacia arriba en el árbol)
+_SKIPPED_KEYS = frozenset(("/FontDescriptor", "/FontFile", "/FontFile2", "/FontFile3", "/Parent"))
+_MAX_DEPTH = 12
+
+
+def _resolve(value):
+    return value.get_object() if hasattr(value, "get_object") else value
+
+
+def _content_bytes(page):
+    contents = page.get_contents()
+    return contents.get_data() if contents is not None else b""
+
+
+def _xobjects(page):
+    resources = _resolve(page.get("/Resources")) or {}
+    return _resolve(resources.get("/XObject")) or {}
+
+
+def _feed(digest, value, depth=0):
+    # Añade al hash el contenido de un objeto con las referencias resueltas: el
+    # repr de una referencia sin resolver incluye la dirección del lector y
+    # cambiaría entre procesos y entre subidas
+    value = _resolve(value)
+    if depth > _MAX_DEPTH:
+        digest.update(b"\0deep\0")
+    elif isinstance(value, dict):
+        if value.get("/Subtype") == "/Image":
+            digest.update(b"\0image\0")
+            return
+        digest.update(b"<<")
+        for key in sorted(value):
+            if key not in _SKIPPED_KEYS:
+                digest.update(str(key).encode("utf-8", "replace"))
+                _feed(digest, value[key], depth + 1)
+        digest.update(b">>")
+        if hasattr(value, "get_data"):
+            # Flujos: ToUnicode de las fuentes, contenido de los formularios
+            digest.update(value.get_data())
+    elif isinstance(value, list):
+        digest.update(b"[")
+        for item in value:
+            _feed(digest, item, depth + 1)
+        digest.update(b"]")
+    else:
+        digest.update(f"{type(value).__name__}:{value!r}".encode("utf-8", "replace"))
+
+
+def page_hash(page, content):
+    # Contenido de la página + fuentes (codificación, ToUnicode) + formularios
+    # (XObject /Form, que pueden contener texto propio con sus recursos)
+    digest = hashlib.sha256(content)
+    resources = _resolve(page.get("/Resources")) or {}
+    digest.update(b"\0fonts\0")
+    _feed(digest, resources.get("/Font"))
+    digest.update(b"\0forms\0")
+    xobjects = _resolve(resources.get("/XObject")) or {}
+    for name in sorted(xobjects):
+        xobject = _resolve(xobjects[name])
+        if xobject.get("/Subtype") == "/Form":
+            digest.update(str(name).encode("utf-8", "replace"))
+            _feed(digest, xobject)
+    return digest.hexdigest()
+
+
+def classify_page(page, content):
+    # Texto si hay bloques BT/ET o formularios (que pueden contener texto);
+    # imagen si solo se dibujan imágenes; vacía en otro caso
+    if _TEXT_BLOCK_RE.search(content):
+        return TEXT
+    xobjects = _xobjects(page)
+    drawn = set(_DRAW_XOBJECT_RE.findall(content))
+    images = False
+    for name, xobject in xobjects.items():
+        if name.lstrip("/").encode() not in drawn:
+            continue
+        if _resolve(xobject).get("/Subtype") == "/Form":
+            return TEXT
+        images = True
+    return IMAGE if images else EMPTY
+
+
+class PageTextCache:
+    # Un archivo de texto por hash de página: <directorio>/<ab>/<hash>.txt
+    def __init__(self, directory):
+        self.directory = directory
+
+    def _file(self, key):
+        return os.path.join(self.directory, key[:2], f"{key}.txt")
+
+    def get(self, key):
+        file_path = self._file(key)
+        try:
+            with open(file_path, encoding="utf-8") as f:
+                text = f.read()
+        except FileNotFoundError:
+            return None
+        # La fecha de modificación marca el último uso (ver reaper.DocumentReaper)
+        try:
+            os.utime(file_path)
+        except OSError:
+            pass
+        return text
+
+    def put(self, key, text):
+        file_path = self._file(key)
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        temporary = f"{file_path}.tmp"
+        with open(temporary, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(temporary, file_path)
+
+
+def new_stats():
+    return {
+        "pages": 0,
+        "text_pages": 0,
+        "image_pages": 0,
+        "empty_pages": 0,
+        "cache_hits": 0,
+        "pages_extracted": 0,
+        "prescan_ms": 0.0,
+        "extract_ms": 0.0
+    }
+
+
+def extract_pdf_text(file_path, cache=None, stats=None):
+    stats = stats if stats is not None else {}
+    for field, value in new_stats().items():
+        stats.setdefault(field, value)
+    parts = []
+    with open(file_path, "rb") as f:
+        pdf = PdfReader(f)
+        for page in pdf.pages:
+            stats["pages"] += 1
+            start = time.perf_counter()
+            content = _content_bytes(page)
+            kind = classify_page(page, content)
+            key = page_hash(page, content) if cache is not None and kind == TEXT else None
+            stats["prescan_ms"] += (time.perf_counter() - start) * 1000
+            stats[f"{kind}_pages"] += 1
+            if kind != TEXT:
+                continue
+
+            text = cache.get(key) if key is not None else None
+            if text is not None:
+                stats["cache_hits"] += 1
+            else:
+                start = time.perf_counter()
+                text = page.extract_text() or ""
+                stats["extract_ms"] += (time.perf_counter() - start) * 1000
+                stats["pages_extracted"] += 1
+                if key is not None:
+                    cache.put(key, text)
+            if text:
+                parts.append(text + "\n")
+    stats["prescan_ms"] = round(stats["prescan_ms"], 1)
+    stats["extract_ms"] = round(stats["extract_ms"], 1)
+    return "".join(parts)
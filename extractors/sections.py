@@ -0,0 +1,233 @@
+# extractors/sections.py
+# Normalización de Markdown/texto que conserva la estructura: una sola
+# expresión regular compilada clasifica cada línea (título, elemento de lista,
+# línea en blanco, texto...) mientras se lee el archivo en streaming. Los
+# chunks respetan títulos y párrafos y llevan el título de su sección.
+import re
+
+HEADING = "heading"
+PLAIN_HEADING = "plain_heading"  # línea corta sin puntuación en texto plano seguida de un párrafo más largo
+PARAGRAPH = "paragraph"
+
+MAX_PLAIN_HEADING_CHARS = 80
+SECTION_SEPARATOR = " > "
+
+_LINE_RE = re.compile(
+    r"(?P<blank>[ \t]*$)"
+    r"|[ \t]{0,3}(?P<fence>```|~~~)"
+    r"|[ \t]{0,3}(?P<hashes>#{1,6})[ \t]+(?P<heading>.*?)[ \t#]*$"
+    r"|[ \t]{0,3}(?P<underline>=+|-+|\*{3,}|_{3,})[ \t]*$"
+    r"|[ \t]*(?P<bullet>[-*+•]|\d{1,3}[.)])[ \t]+(?P<item>.*)$"
+    r"|[ \t]*(?P<text>.*)$"
+)
+
+_PLAIN_HEADING_END = tuple(".,;?!…¿¡\"'")
+
+
+def _collapse(text):
+    return " ".join(text.split())
+
+
+def iter_blocks(lines, markdown=True):
+    # Genera (tipo, texto, nivel) a partir de un iterable de líneas. Una línea
+    # de texto plano con forma de título solo se trata como tal si la sigue un
+    # párrafo más largo; si no (pares etiqueta / valor, líneas sueltas) es un
+    # párrafo más
+    candidate = None
+    for block in _iter_line_blocks(lines, markdown):
+        if candidate is not None:
+            if block[0] == PARAGRAPH and len(block[1]) > len(candidate[1]):
+                yield candidate
+            else:
+                yield (PARAGRAPH, candidate[1], 0)
+            candidate = None
+        if block[0] == PLAIN_HEADING:
+            candidate = block
+        else:
+            yield block
+    if candidate is not None:
+        yield (PARAGRAPH, candidate[1], 0)
+
+
+def _iter_line_blocks(lines, markdown):
+    segments = []       # líneas del párrafo actual; cada elemento de lista abre una nueva
+    single_line = True  # el párrafo tiene una sola línea de texto (posible título setext)
+    fence = None
+    fenced = []
+
+    def flush():
+        nonlocal segments, single_line
+        if not segments:
+            return None
+        text = "\n".join(segments)
+        is_plain_heading = (
+            not markdown and single_line and len(segments) == 1
+            and len(text) <= MAX_PLAIN_HEADING_CHARS and not text.endswith(_PLAIN_HEADING_END)
+            and any(c.isalpha() for c in text)
+        )
+        segments = []
+        single_line = True
+        if is_plain_heading:
+            return (PLAIN_HEADING, text, 2)
+        return (PARAGRAPH, text, 0)
+
+    for line in lines:
+        line = line.rstrip("\r\n")
+
+        if fence is not None:
+            if line.lstrip().startswith(fence):
+                yield (PARAGRAPH, "\n".join(fenced), 0)
+                fence = None
+                fenced = []
+            else:
+                fenced.append(line)
+            continue
+
+        match = _LINE_RE.match(line)
+        group = match.lastgroup
+
+        if group == "blank":
+            block = flush()
+            if block:
+                yield block
+        elif group == "fence" and markdown:
+            block = flush()
+            if block:
+                yield block
+            fence = match.group("fence")
+        elif group == "heading" and markdown:
+            block = flush()
+            if block:
+                yield block
+            yield (HEADING, _collapse(match.group("heading")), len(match.group("hashes")))
+        elif group == "underline":
+            marker = match.group("underline")
+            if marker[0] in "=-" and single_line and len(segments) == 1:
+                # Título setext: la línea anterior subrayada con === o ---
+                yield (HEADING, segments[0], 1 if marker[0] == "=" else 2)
+                segments = []
+            else:
+                # Separador horizontal
+                block = flush()
+                if block:
+                    yield block
+        elif group == "item":
+            single_line = False
+            item = _collapse(match.group("item"))
+            if item:
+                bullet = match.group("bullet")
+                segments.append(f"{bullet if bullet[0].isdigit() else '-'} {item}")
+        else:
+            # En texto plano, "#" y las vallas de código son texto normal
+            text = _collapse(match.group("text") if group == "text" else line)
+            if not text:
+                continue
+            if segments:
+                # Las líneas de un mismo párrafo (o de un elemento) se unen con un espacio
+                segments[-1] = f"{segments[-1]} {text}"
+                single_line = False
+            else:
+                segments.append(text)
+
+    if fenced:
+        yield (PARAGRAPH, "\n".join(fenced), 0)
+    block = flush()
+    if block:
+        yield block
+
+
+def _split_long(text, chunk_size, overlap):
+    # Párrafos más largos que un chunk: cortar en espacios con solapamiento
+    start = 0
+    while start < len(text):
+        end = min(start + chunk_size, len(text))
+        if end < len(text):
+            boundary = text.rfind(" ", start + overlap + 1, end)
+            if boundary != -1:
+                end = boundary
+        yield text[start:end].strip()
+        if end >= len(text):
+            break
+        start = end - overlap
+
+
+def chunk_blocks(blocks, chunk_size=1000, overlap=100):
+    # Devuelve (chunks, secciones). Los párrafos no se parten salvo que no
+    # quepan en un chunk, y las secciones pequeñas seguidas se empaquetan en el
+    # mismo chunk hasta chunk_size con su título en línea; cada chunk lleva la
+    # sección en la que empieza. Un título sin contenido debajo (seguido de
+    # otro título o al final) se guarda como contenido, igual que los títulos
+    # deducidos en texto plano
+    chunks = []
+    sections = []
+    path = []
+    current = []
+    size = 0
+    section = ""
+    pending = None  # (tipo, texto) del último título mientras no llega su contenido
+
+    def flush():
+        nonlocal current, size
+        if current:
+            chunks.append("\n\n".join(current))
+            sections.append(section)
+        current = []
+        size = 0
+
+    def start():
+        # Cerrar el chunk actual; el siguiente empieza en la sección actual
+        nonlocal section
+        flush()
+        section = SECTION_SEPARATOR.join(title for _, title in path)
+
+    def add(text):
+        nonlocal size
+        current.append(text)
+        size += len(text) + 2
+
+    def place(text):
+        if not current or size + len(text) + 2 > chunk_size:
+            start()
+        add(text)
+
+    for kind, text, level in blocks:
+        if kind in (HEADING, PLAIN_HEADING):
+            if pending is not None:
+                place(pending[1])
+            while path and path[-1][0] >= level:
+                path.pop()
+            path.append((level, text))
+            pending = (kind, text)
+            continue
+
+        heading_only = False
+        if pending is not None:
+            heading_kind, heading = pending
+            pending = None
+            if current and size + len(heading) + len(text) + 4 <= chunk_size:
+                add(heading)
+            else:
+                start()
+                if heading_kind == PLAIN_HEADING:
+                    add(heading)
+                    heading_only = True
+
+        if len(text) > chunk_size:
+            # El primer trozo comparte chunk con el título deducido que lo precede
+            for number, piece in enumerate(_split_long(text, chunk_size, overlap)):
+                if number or not heading_only:
+                    start()
+                add(piece)
+            continue
+
+        place(text)
+
+    if pending is not None:
+        place(pending[1])
+    flush()
+    return chunks, sections
+
+
+def chunk_structured_file(file_path, markdown=True, chunk_size=1000, overlap=100):
+    with open(file_path, "r", encoding="utf-8", errors="ignore") as f:
+        return chunk_blocks(iter_blocks(f, markdown=markdown), chunk_size, overlap)
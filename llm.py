@@ -0,0 +1,212 @@
+# llm.py
+# Backends de generación intercambiables. Todos exponen
+# complete(messages, model) -> (texto, usage) con el formato de OpenAI:
+# - OpenAIChatBackend: /v1/chat/completions (Deepseek y compatibles)
+# - OpenAICompletionsBackend: /v1/completions con varias prompts por llamada
+#   (vLLM, llama.cpp server...), lo que permite agrupar peticiones
+# - LocalBackend: respuestas deterministas sin red, para pruebas y uso offline
+# MicroBatcher agrupa las peticiones concurrentes de un backend que admite
+# lotes en una sola llamada al proveedor.
+import asyncio
+import os
+
+from extractive import extract_answer
+
+NOT_FOUND_ANSWER = "No encuentro esa información en el documento."
+
+
+def count_tokens(text):
+    # Aproximación barata: una palabra ~ un token
+    return len(text.split())
+
+
+def split_prompt(messages):
+    # Documento y pregunta del último mensaje del usuario (ver app.build_messages)
+    content = messages[-1]["content"] if messages else ""
+    context, _, question = content.rpartition("\n\nPregunta: ")
+    return context.replace("Documento:\n\n", "", 1), question
+
+
+class LLMBackend:
+    supports_batching = False
+
+    def __init__(self, name, model):
+        self.name = name
+        self.model = model
+
+    async def complete(self, messages, model=None):
+        raise NotImplementedError
+
+    async def complete_many(self, batch, model=None):
+        # Por defecto, una llamada por petición
+        return await asyncio.gather(*(self.complete(messages, model) for messages in batch))
+
+
+class OpenAIChatBackend(LLMBackend):
+    def __init__(self, name, url, api_key, model, client, temperature=0.1, max_tokens=500):
+        super().__init__(name, model)
+        self.url = url
+        self.api_key = api_key
+        self.client = client  # función que devuelve el httpx.AsyncClient compartido
+        self.temperature = temperature
+        self.max_tokens = max_tokens
+
+    def headers(self):
+        headers = {"Content-Type": "application/json"}
+        if self.api_key:
+            headers["Authorization"] = f"Bearer {self.api_key}"
+        return headers
+
+    async def post(self, payload):
+        response = await self.client().post(self.url, headers=self.headers(), json=payload)
+        return response.json()
+
+    async def complete(self, messages, model=None):
+        result = await self.post({
+            "model": model or self.model,
+            "messages": messages,
+            "temperature": self.temperature,  # Baja temperatura para respuestas más precisas
+            "max_tokens": self.max_tokens
+        })
+        if "choices" in result and len(result["choices"]) > 0:
+            return result["choices"][0]["message"]["content"], result.get("usage", {})
+        raise ValueError(f"No se recibió una respuesta válida de {self.name}")
+
+
+class OpenAICompletionsBackend(OpenAIChatBackend):
+    supports_batching = True
+
+    @staticmethod
+    def render(messages):
+        # Plantilla de chat mínima para servidores de completions sin plantilla propia
+        lines = [f"{message['role']}: {message['content']}" for message in messages]
+        return "\n\n".join(lines) + "\n\nassistant:"
+
+    async def complete(self, messages, model=None):
+        return (await self.complete_many([messages], model))[0]
+
+    async def complete_many(self, batch, model=None):
+        prompts = [self.render(messages) for messages in batch]
+        result = await self.post({
+            "model": model or self.model,
+            "prompt": prompts,
+            "temperature": self.temperature,
+            "max_tokens": self.max_tokens
+        })
+        choices = result.get("choices") or []
+        texts = {choice.get("index", position): choice.get("text", "") for position, choice in enumerate(choices)}
+        if len(texts) < len(prompts):
+            raise ValueError(f"No se recibió una respuesta válida de {self.name}")
+
+        # El proveedor devuelve un único "usage" por llamada: se reparte en
+        # proporción a la longitud de cada prompt y de cada respuesta
+        usage = result.get("usage") or {}
+        prompt_sizes = [count_tokens(prompt) or 1 for prompt in prompts]
+        answer_sizes = [count_tokens(texts[i]) or 1 for i in range(len(prompts))]
+        answers = []
+        for i in range(len(prompts)):
+            prompt_tokens = round(usage.get("prompt_tokens", 0) * prompt_sizes[i] / sum(prompt_sizes))
+            completion_tokens = round(usage.get("completion_tokens", 0) * answer_sizes[i] / sum(answer_sizes))
+            answers.append((texts[i].strip(), {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens
+            }))
+        return answers
+
+
+class LocalBackend(LLMBackend):
+    # Sin red ni aleatoriedad: responde con la frase del contexto que más cubre
+    # la pregunta y cuenta los tokens por palabras
+    supports_batching = True
+
+    def __init__(self, name="local", model="local-extractive"):
+        super().__init__(name, model)
+
+    async def complete(self, messages, model=None):
+        context, question = split_prompt(messages)
+        sentence, confidence = extract_answer(question, [context], lambda term: 1.0)
+        answer = sentence if sentence is not None and confidence > 0 else NOT_FOUND_ANSWER
+        prompt_tokens = sum(count_tokens(message["content"]) for message in messages)
+        completion_tokens = count_tokens(answer)
+        return answer, {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens
+        }
+
+
+class MicroBatcher:
+    # Las peticiones que llegan en una ventana de `max_wait` segundos (o hasta
+    # `max_batch`) se envían juntas, una llamada por modelo
+    def __init__(self, backend, max_batch=16, max_wait=0.01):
+        self.backend = backend
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.pending = []
+        self.batches = 0
+        self.requests = 0
+        self._timer = None
+        self._tasks = set()
+
+    async def complete(self, messages, model=None):
+        future = asyncio.get_running_loop().create_future()
+        self.pending.append((model, messages, future))
+        if len(self.pending) >= self.max_batch:
+            self.flush()
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(self.max_wait, self.flush)
+        return await future
+
+    def flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        pending, self.pending = self.pending, []
+        groups = {}
+        for model, messages, future in pending:
+            groups.setdefault(model, []).append((messages, future))
+        for model, items in groups.items():
+            task = asyncio.create_task(self._send(model, items))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _send(self, model, items):
+        self.batches += 1
+        self.requests += len(items)
+        try:
+            results = await self.backend.complete_many([messages for messages, _ in items], model)
+        except Exception as e:
+            for _, future in items:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, future), result in zip(items, results):
+            if not future.done():
+                future.set_result(result)
+
+
+def load_backends(specs, client):
+    # specs: {"nombre": {"type": "chat"|"completions"|"local", "url", "api_key_env", "model",
+    #                    "batch": bool, "max_batch": int, "max_wait_ms": float}}
+    backends = {}
+    batchers = {}
+    for name, spec in specs.items():
+        kind = spec.get("type", "chat")
+        if kind == "local":
+            backend = LocalBackend(name, spec.get("model", "local-extractive"))
+        elif kind in ("chat", "completions"):
+            backend_class = OpenAIChatBackend if kind == "chat" else OpenAICompletionsBackend
+            backend = backend_class(
+                name, spec["url"], spec.get("api_key") or os.environ.get(spec.get("api_key_env", ""), ""),
+                spec["model"], client,
+                temperature=spec.get("temperature", 0.1), max_tokens=spec.get("max_tokens", 500)
+            )
+        else:
+            raise ValueError(f"Tipo de backend desconocido para {name}: {kind}")
+        backends[name] = backend
+        if backend.supports_batching and spec.get("batch", False):
+            batchers[name] = MicroBatcher(
+                backend, max_batch=spec.get("max_batch", 16), max_wait=spec.get("max_wait_ms", 10) / 1000
+            )
+    return backends, batchers
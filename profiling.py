@@ -0,0 +1,176 @@
+# profiling.py
+# Perfilado opcional por petición: se activa con una cabecera de administrador
+# (X-Profile: cprofile | sample) o por muestreo aleatorio, y guarda el perfil
+# para descargarlo después desde los endpoints de administración.
+import cProfile
+import hmac
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict
+from datetime import datetime
+
+PROFILE_MODES = ("cprofile", "sample")
+
+
+class StackSampler:
+    # Perfilador estadístico: un hilo toma la pila del hilo del event loop cada
+    # `interval` segundos. Captura tanto el código síncrono (extract_text,
+    # PyPDF2) como las esperas de la llamada asíncrona al proveedor.
+    def __init__(self, thread_id, interval=0.005):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _sample(self):
+        frame = sys._current_frames().get(self.thread_id)
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+            frame = frame.f_back
+        if stack:
+            self.samples[";".join(reversed(stack))] += 1
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    # Una muestra al empezar y otra al terminar: las peticiones más cortas que
+    # el intervalo también dejan un perfil con contenido
+    def start(self):
+        self._sample()
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        self._sample()
+
+    def folded(self):
+        # Formato "folded" compatible con flamegraph.pl / speedscope
+        return "".join(f"{stack} {count}\n" for stack, count in self.samples.most_common())
+
+
+class ProfileStore:
+    # Guarda los perfiles en disco y mantiene solo los `max_profiles` más recientes
+    def __init__(self, directory="profiles", max_profiles=50):
+        self.directory = directory
+        self.max_profiles = max_profiles
+        self.profiles = OrderedDict()
+        self._busy = False
+
+    def acquire(self):
+        # Solo un perfil a la vez: cProfile no admite perfiles anidados
+        if self._busy:
+            return False
+        self._busy = True
+        return True
+
+    def release(self):
+        self._busy = False
+
+    def save(self, meta, write):
+        os.makedirs(self.directory, exist_ok=True)
+        extension = "prof" if meta["mode"] == "cprofile" else "folded"
+        file_path = os.path.join(self.directory, f"{meta['id']}.{extension}")
+        write(file_path)
+        meta["file"] = file_path
+        meta["size"] = os.path.getsize(file_path)
+        self.profiles[meta["id"]] = meta
+
+        while len(self.profiles) > self.max_profiles:
+            _, old = self.profiles.popitem(last=False)
+            if os.path.exists(old["file"]):
+                os.remove(old["file"])
+        return meta
+
+    def get(self, profile_id):
+        return self.profiles.get(profile_id)
+
+    def list(self):
+        return [{k: v for k, v in meta.items() if k != "file"} for meta in reversed(self.profiles.values())]
+
+
+class ProfilingMiddleware:
+    # Middleware ASGI puro: cuando el perfilado no se solicita, el coste es una
+    # comprobación de ruta (y de cabeceras en las rutas perfilables)
+    def __init__(self, app, store, paths, admin_token=None, sample_rate=0.0, sample_mode="cprofile"):
+        self.app = app
+        self.store = store
+        self.paths = frozenset(paths)
+        self.admin_token = admin_token.encode() if admin_token else None
+        self.sample_rate = sample_rate
+        self.sample_mode = sample_mode
+
+    def _requested(self, scope):
+        if self.admin_token:
+            mode = token = None
+            for name, value in scope["headers"]:
+                if name == b"x-profile":
+                    mode = value.decode("latin-1").strip().lower()
+                elif name == b"x-admin-token":
+                    token = value
+            if mode and token is not None and hmac.compare_digest(token, self.admin_token):
+                return (mode if mode in PROFILE_MODES else "cprofile"), "header"
+        if self.sample_rate and random.random() < self.sample_rate:
+            return self.sample_mode, "sample"
+        return None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] not in self.paths:
+            return await self.app(scope, receive, send)
+
+        requested = self._requested(scope)
+        if requested is None or not self.store.acquire():
+            return await self.app(scope, receive, send)
+
+        mode, trigger = requested
+        profile_id = uuid.uuid4().hex
+        meta = {
+            "id": profile_id,
+            "path": scope["path"],
+            "method": scope["method"],
+            "mode": mode,
+            "trigger": trigger,
+            "started_at": datetime.now().isoformat(),
+            "status": None
+        }
+
+        async def send_with_header(message):
+            if message["type"] == "http.response.start":
+                meta["status"] = message["status"]
+                message["headers"] = list(message.get("headers", [])) + [(b"x-profile-id", profile_id.encode())]
+            await send(message)
+
+        # Nota: el perfil incluye cualquier otra petición que el event loop
+        # atienda mientras tanto; para aislar un caso, reproducirlo sin carga
+        if mode == "cprofile":
+            collector = cProfile.Profile()
+            collector.enable()
+        else:
+            collector = StackSampler(threading.get_ident())
+            collector.start()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_header)
+        finally:
+            if mode == "cprofile":
+                collector.disable()
+                write = collector.dump_stats
+            else:
+                collector.stop()
+
+                def write(file_path):
+                    with open(file_path, "w", encoding="utf-8") as f:
+                        f.write(collector.folded())
+            meta["duration_ms"] = round((time.perf_counter() - start) * 1000, 2)
+            try:
+                self.store.save(meta, write)
+            finally:
+                self.store.release()
@@ -0,0 +1,182 @@
+# ratelimit.py
+# Limitación de peticiones en proceso: token buckets por chatbot, por origen,
+# por IP del cliente y para los lotes de preguntas, más cuotas diarias de tokens a partir de los campos
+# "usage" que devuelve el proveedor. Los contadores se guardan en disco.
+import json
+import os
+import time
+from datetime import date
+
+MAX_IDLE_BUCKETS = 50000
+
+
+class TokenBucket:
+    __slots__ = ("tokens", "updated")
+
+    def __init__(self, capacity, now):
+        self.tokens = capacity
+        self.updated = now
+
+
+class LimitExceeded(Exception):
+    def __init__(self, scope, retry_after, detail):
+        super().__init__(detail)
+        self.scope = scope
+        self.retry_after = retry_after
+        self.detail = detail
+
+
+class RateLimiter:
+    def __init__(self, per_minute, daily_token_quota=0, state_file=None):
+        # per_minute: {"chatbot": 60, "origin": 120, "ip": 20, "batch": 1000}; 0 desactiva el límite
+        self.policies = {
+            scope: (limit / 60.0, float(limit))
+            for scope, limit in per_minute.items() if limit > 0
+        }
+        self.daily_token_quota = daily_token_quota
+        self.state_file = state_file
+        self.buckets = {}
+        self.day = date.today().isoformat()
+        self.tokens_used = {}     # clave de chatbot -> tokens consumidos hoy
+        self.requests_today = {}  # clave de chatbot -> peticiones hoy
+        self.requests_total = {}  # clave de chatbot -> peticiones históricas
+        self.dirty = False
+
+    def _refill(self, scope, key, now):
+        # Bucket al día (o None si el ámbito no tiene límite); no consume
+        policy = self.policies.get(scope)
+        if policy is None or not key:
+            return None
+        rate, capacity = policy
+        bucket_key = (scope, key)
+        bucket = self.buckets.get(bucket_key)
+        if bucket is None:
+            bucket = self.buckets[bucket_key] = TokenBucket(capacity, now)
+        else:
+            bucket.tokens = min(capacity, bucket.tokens + (now - bucket.updated) * rate)
+            bucket.updated = now
+        if bucket.tokens < 1.0:
+            retry_after = (1.0 - bucket.tokens) / rate
+            raise LimitExceeded(scope, retry_after, "Demasiadas peticiones, inténtalo de nuevo más tarde")
+        return bucket
+
+    def _roll_day(self):
+        today = date.today().isoformat()
+        if today != self.day:
+            self.day = today
+            self.tokens_used.clear()
+            self.requests_today.clear()
+            self.dirty = True
+
+    def check_quota(self, chatbot_key, quota=None):
+        self._roll_day()
+        quota = self.daily_token_quota if quota is None else quota
+        if quota and self.tokens_used.get(chatbot_key, 0) >= quota:
+            raise LimitExceeded("quota", self._seconds_to_midnight(), "Cuota diaria de tokens agotada")
+
+    def check(self, chatbot_key, origin=None, ip=None, quota=None, cost=1):
+        # Lanza LimitExceeded antes de hacer cualquier trabajo costoso
+        return self._consume(chatbot_key, (("ip", ip), ("origin", origin), ("chatbot", chatbot_key)), quota, cost)
+
+    def check_batch(self, chatbot_key, quota=None, cost=1):
+        # Los lotes (evaluación fuera de línea) tienen su propio bucket por
+        # chatbot, en preguntas por minuto, en vez de los del widget
+        return self._consume(chatbot_key, (("batch", chatbot_key),), quota, cost)
+
+    def _consume(self, chatbot_key, scopes, quota, cost):
+        # Se comprueban todos los buckets antes de consumir de ninguno. Con
+        # cost > 1 (un lote de preguntas) devuelve cuántas se conceden: tantas
+        # como fichas enteras queden en el bucket más vacío
+        self.check_quota(chatbot_key, quota)
+
+        now = time.monotonic()
+        buckets = [bucket for bucket in (self._refill(scope, key, now) for scope, key in scopes) if bucket is not None]
+        granted = min([cost] + [int(bucket.tokens) for bucket in buckets])
+        for bucket in buckets:
+            bucket.tokens -= granted
+
+        self.requests_today[chatbot_key] = self.requests_today.get(chatbot_key, 0) + granted
+        self.requests_total[chatbot_key] = self.requests_total.get(chatbot_key, 0) + granted
+        self.dirty = True
+        return granted
+
+    def record_usage(self, chatbot_key, usage):
+        tokens = (usage or {}).get("total_tokens") or 0
+        if tokens:
+            self._roll_day()
+            self.tokens_used[chatbot_key] = self.tokens_used.get(chatbot_key, 0) + tokens
+            self.dirty = True
+
+    def usage(self, chatbot_key):
+        self._roll_day()
+        return {
+            "day": self.day,
+            "tokens_used": self.tokens_used.get(chatbot_key, 0),
+            "requests_today": self.requests_today.get(chatbot_key, 0),
+            "requests_total": self.requests_total.get(chatbot_key, 0)
+        }
+
+    def forget(self, chatbot_key):
+        # Olvidar los contadores de un chatbot o documento que ya no existe
+        for counters in (self.tokens_used, self.requests_today, self.requests_total):
+            if counters.pop(chatbot_key, None) is not None:
+                self.dirty = True
+
+    def retain(self, is_known):
+        # Conservar solo los contadores de claves que siguen existiendo
+        for counters in (self.tokens_used, self.requests_today, self.requests_total):
+            for chatbot_key in [key for key in counters if not is_known(key)]:
+                del counters[chatbot_key]
+                self.dirty = True
+
+    def most_used(self, limit=10):
+        return sorted(self.requests_total, key=self.requests_total.get, reverse=True)[:limit]
+
+    @staticmethod
+    def _seconds_to_midnight():
+        now = time.localtime()
+        return 86400 - (now.tm_hour * 3600 + now.tm_min * 60 + now.tm_sec)
+
+    def prune(self):
+        # Olvidar buckets que ya se han rellenado del todo (equivalen a uno nuevo)
+        if len(self.buckets) <= MAX_IDLE_BUCKETS:
+            return
+        now = time.monotonic()
+        for bucket_key, bucket in list(self.buckets.items()):
+            rate, capacity = self.policies[bucket_key[0]]
+            if bucket.tokens + (now - bucket.updated) * rate >= capacity:
+                del self.buckets[bucket_key]
+
+    def load(self):
+        if not self.state_file or not os.path.exists(self.state_file):
+            return
+        try:
+            with open(self.state_file, encoding="utf-8") as f:
+                state = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"No se pudieron cargar los contadores de uso: {str(e)}")
+            return
+        self.requests_total = state.get("requests_total", {})
+        if state.get("day") == date.today().isoformat():
+            self.day = state["day"]
+            self.tokens_used = state.get("tokens_used", {})
+            self.requests_today = state.get("requests_today", {})
+
+    def save(self):
+        if not self.state_file or not self.dirty:
+            return
+        directory = os.path.dirname(self.state_file)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        state = {
+            "day": self.day,
+            "tokens_used": self.tokens_used,
+            "requests_today": self.requests_today,
+            "requests_total": self.requests_total
+        }
+        # Escritura atómica para no dejar el archivo a medias
+        temporary = f"{self.state_file}.tmp"
+        with open(temporary, "w", encoding="utf-8") as f:
+            json.dump(state, f)
+        os.replace(temporary, self.state_file)
+        self.dirty = False
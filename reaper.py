@@ -0,0 +1,156 @@
+# reaper.py
+# Recolección en segundo plano de documentos que ningún chatbot usa. El registro
+# de chatbots lleva la cuenta de referencias por documento; un documento sin
+# referencias se marca como huérfano y, pasado el periodo de gracia sin volver
+# a usarse, se olvida y se borra su archivo .chunks. En la misma pasada se
+# borran los archivos de uploads/ sin documento (subidas fallidas o de
+# documentos recolectados) y los .tmp que dejó una escritura interrumpida, y
+# se recorta la caché de páginas de PDF: primero las páginas sin usar desde
+# hace más de `page_cache_max_age` y después las menos usadas recientemente
+# hasta quedar por debajo de `page_cache_max_bytes`.
+# Las decisiones se toman en el bucle de eventos, por tandas; el acceso al
+# disco va en un hilo.
+import asyncio
+import os
+import time
+
+SCAN_SLICE = 1000     # documentos revisados entre dos cesiones del bucle
+MIN_FILE_AGE = 300    # un archivo más reciente puede ser una subida en curso
+
+
+class DocumentReaper:
+    def __init__(self, documents, chatbots, uploads_dir, grace_period=86400, batch_size=100,
+                 page_cache_dir=None, page_cache_max_bytes=0, page_cache_max_age=0):
+        self.documents = documents
+        self.chatbots = chatbots
+        self.uploads_dir = uploads_dir
+        self.grace_period = grace_period
+        self.batch_size = batch_size
+        self.page_cache_dir = page_cache_dir
+        self.page_cache_max_bytes = page_cache_max_bytes  # 0: sin límite de tamaño
+        self.page_cache_max_age = page_cache_max_age      # 0: sin límite de antigüedad
+        self.orphaned_since = {}  # id de documento -> momento en que quedó sin referencias
+        self.stats = {
+            "sweeps": 0,
+            "documents_evicted": 0,
+            "uploads_removed": 0,
+            "temp_files_removed": 0,
+            "cached_pages_removed": 0,
+            "page_cache_bytes": 0,
+            "bytes_reclaimed": 0,
+            "last_sweep_ms": 0.0
+        }
+
+    def release(self, document_id, now=None):
+        # Llamar al quitar una referencia: si era la última empieza la gracia
+        if document_id in self.documents and not self.chatbots.document_refcount(document_id):
+            self.orphaned_since.setdefault(document_id, now if now is not None else time.time())
+
+    def touch(self, document_id, now=None):
+        # Un documento huérfano que se sigue consultando no se recolecta
+        if document_id in self.orphaned_since:
+            self.orphaned_since[document_id] = now if now is not None else time.time()
+
+    @property
+    def orphaned(self):
+        return len(self.orphaned_since)
+
+    async def sweep(self, now=None):
+        start = time.perf_counter()
+        now = now if now is not None else time.time()
+        chunk_files = []
+        known = list(self.documents)
+        for first in range(0, len(known), SCAN_SLICE):
+            # Comprobar y olvidar sin ceder el bucle: nadie puede crear un
+            # chatbot sobre el documento entre la comprobación y el olvido
+            for document_id in known[first:first + SCAN_SLICE]:
+                if self.chatbots.document_refcount(document_id):
+                    self.orphaned_since.pop(document_id, None)
+                    continue
+                since = self.orphaned_since.setdefault(document_id, now)
+                if now - since >= self.grace_period and len(chunk_files) < self.batch_size:
+                    chunk_files.append(self.documents.evict(document_id))
+                    del self.orphaned_since[document_id]
+            await asyncio.sleep(0)
+        for document_id in [d for d in self.orphaned_since if d not in self.documents]:
+            del self.orphaned_since[document_id]
+
+        removed = await asyncio.to_thread(self._remove_files, chunk_files, now)
+        self.stats["sweeps"] += 1
+        self.stats["documents_evicted"] += len(chunk_files)
+        self.stats["page_cache_bytes"] = removed.pop("page_cache_bytes")
+        for field, value in removed.items():
+            self.stats[field] += value
+        self.stats["last_sweep_ms"] = round((time.perf_counter() - start) * 1000, 1)
+        return removed
+
+    def _remove_files(self, chunk_files, now):
+        removed = {"uploads_removed": 0, "temp_files_removed": 0, "cached_pages_removed": 0, "bytes_reclaimed": 0}
+        for file_path in chunk_files:
+            removed["bytes_reclaimed"] += _unlink(file_path)
+
+        min_age = max(self.grace_period, MIN_FILE_AGE)
+        budget = self.batch_size
+        # Subidas: uploads/<id de documento>_<nombre original>
+        for entry in _entries(self.uploads_dir):
+            if budget <= 0:
+                break
+            document_id = entry.name.partition("_")[0]
+            if document_id in self.documents or now - entry.stat().st_mtime < min_age:
+                continue
+            removed["bytes_reclaimed"] += _unlink(entry.path)
+            removed["uploads_removed"] += 1
+            budget -= 1
+        for entry in _entries(self.documents.directory):
+            if budget <= 0:
+                break
+            if not entry.name.endswith(".tmp") or now - entry.stat().st_mtime < min_age:
+                continue
+            removed["bytes_reclaimed"] += _unlink(entry.path)
+            removed["temp_files_removed"] += 1
+            budget -= 1
+        self._trim_page_cache(removed, now)
+        return removed
+
+    def _trim_page_cache(self, removed, now):
+        # Caché de páginas: <directorio>/<ab>/<hash>.txt, con la fecha de
+        # modificación al día en cada acierto. Hasta batch_size archivos por pasada
+        removed["page_cache_bytes"] = 0
+        if not self.page_cache_dir:
+            return
+        pages = []
+        for shard in _entries(self.page_cache_dir, directories=True):
+            for entry in _entries(shard.path):
+                stat = entry.stat()
+                pages.append((stat.st_mtime, stat.st_size, entry.path))
+        pages.sort()
+        total = sum(size for _, size, _ in pages)
+        budget = self.batch_size
+        for modified, size, file_path in pages:
+            expired = self.page_cache_max_age and now - modified > self.page_cache_max_age
+            oversized = self.page_cache_max_bytes and total > self.page_cache_max_bytes
+            if budget <= 0 or not (expired or oversized):
+                break
+            reclaimed = _unlink(file_path)
+            removed["bytes_reclaimed"] += reclaimed
+            removed["cached_pages_removed"] += 1
+            total -= reclaimed
+            budget -= 1
+        removed["page_cache_bytes"] = total
+
+
+def _entries(directory, directories=False):
+    try:
+        with os.scandir(directory) as entries:
+            return [entry for entry in entries if (entry.is_dir() if directories else entry.is_file())]
+    except FileNotFoundError:
+        return []
+
+
+def _unlink(file_path):
+    try:
+        size = os.path.getsize(file_path)
+        os.remove(file_path)
+    except FileNotFoundError:
+        return 0
+    return size
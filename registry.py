@@ -0,0 +1,193 @@
+# registry.py
+# Registro de chatbots con índices secundarios (propietario, documento, fecha
+# de creación y nombre) y paginación por cursor. El resumen que devuelve el
+# listado se precalcula al crear o actualizar, sin joins por elemento.
+import base64
+import binascii
+import json
+import os
+from bisect import bisect_left, bisect_right, insort
+from collections import defaultdict
+
+SORT_FIELDS = ("created_at", "name")
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(sort, order, key):
+    raw = json.dumps([sort, order, list(key)], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor, sort, order):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        cursor_sort, cursor_order, key = json.loads(raw)
+    except (binascii.Error, ValueError, TypeError):
+        raise InvalidCursor("Cursor no válido")
+    if cursor_sort != sort or cursor_order != order or not isinstance(key, list) or len(key) != 2:
+        raise InvalidCursor("El cursor no corresponde a este orden")
+    # Las claves de orden son (valor, id de chatbot), ambas cadenas
+    if not all(isinstance(part, str) for part in key):
+        raise InvalidCursor("Cursor no válido")
+    return tuple(key)
+
+
+class ChatbotRegistry:
+    def __init__(self):
+        self._configs = {}
+        self._summaries = {}
+        self._by_owner = defaultdict(set)
+        self._by_document = defaultdict(set)
+        self._sorted = {field: [] for field in SORT_FIELDS}
+        self.dirty = False
+
+    # Acceso tipo diccionario para las rutas existentes
+    def __contains__(self, chatbot_id):
+        return chatbot_id in self._configs
+
+    def __getitem__(self, chatbot_id):
+        return self._configs[chatbot_id]
+
+    def __len__(self):
+        return len(self._configs)
+
+    def get(self, chatbot_id, default=None):
+        return self._configs.get(chatbot_id, default)
+
+    def ids_for_document(self, document_id):
+        return set(self._by_document.get(document_id, ()))
+
+    def document_refcount(self, document_id):
+        # Chatbots que usan el documento (ver reaper.DocumentReaper)
+        return len(self._by_document.get(document_id, ()))
+
+    def _sort_key(self, field, chatbot_id, config):
+        if field == "name":
+            return (config["name"].casefold(), chatbot_id)
+        return (config.get("created_at", ""), chatbot_id)
+
+    def _index(self, chatbot_id, config):
+        self._by_owner[config.get("owner_id") or ""].add(chatbot_id)
+        self._by_document[config["document_id"]].add(chatbot_id)
+        for field in SORT_FIELDS:
+            insort(self._sorted[field], self._sort_key(field, chatbot_id, config))
+
+    def _unindex(self, chatbot_id, config):
+        for index, key in ((self._by_owner, config.get("owner_id") or ""), (self._by_document, config["document_id"])):
+            ids = index.get(key)
+            if ids is not None:
+                ids.discard(chatbot_id)
+                if not ids:
+                    del index[key]
+        for field in SORT_FIELDS:
+            keys = self._sorted[field]
+            position = bisect_left(keys, self._sort_key(field, chatbot_id, config))
+            if position < len(keys) and keys[position][1] == chatbot_id:
+                del keys[position]
+
+    def _summarize(self, chatbot_id, config, document_name):
+        self._summaries[chatbot_id] = {
+            "id": chatbot_id,
+            "name": config["name"],
+            "document_name": document_name,
+            "primary_color": config["primary_color"],
+            "created_at": config.get("created_at", ""),
+            "owner_id": config.get("owner_id")
+        }
+
+    def add(self, chatbot_id, config, document_name="Unknown"):
+        self._configs[chatbot_id] = config
+        self._index(chatbot_id, config)
+        self._summarize(chatbot_id, config, document_name)
+        self.dirty = True
+
+    def update(self, chatbot_id, changes, document_name="Unknown"):
+        config = self._configs[chatbot_id]
+        self._unindex(chatbot_id, config)
+        config.update(changes)
+        self._index(chatbot_id, config)
+        self._summarize(chatbot_id, config, document_name)
+        self.dirty = True
+
+    def remove(self, chatbot_id):
+        config = self._configs.pop(chatbot_id)
+        self._unindex(chatbot_id, config)
+        del self._summaries[chatbot_id]
+        self.dirty = True
+        return config
+
+    def query(self, owner_id=None, document_id=None, name=None, sort="created_at", order="desc",
+              cursor=None, limit=50):
+        # Devuelve (resúmenes, siguiente_cursor, total) sin recorrer todo el registro
+        if sort not in SORT_FIELDS:
+            raise ValueError(f"Orden no soportado: {sort}")
+        descending = order == "desc"
+        name = name.casefold() if name else None
+
+        # Con filtros por índice se parte del conjunto de candidatos más pequeño
+        candidates = None
+        for index, key in ((self._by_owner, owner_id), (self._by_document, document_id)):
+            if key is not None:
+                ids = index.get(key, set())
+                candidates = ids if candidates is None else candidates & ids
+        if candidates is None:
+            keys = self._sorted[sort]
+        else:
+            keys = sorted(self._sort_key(sort, chatbot_id, self._configs[chatbot_id]) for chatbot_id in candidates)
+
+        if cursor:
+            position = decode_cursor(cursor, sort, order)
+            start = bisect_left(keys, position) - 1 if descending else bisect_right(keys, position)
+        else:
+            start = len(keys) - 1 if descending else 0
+        step = -1 if descending else 1
+
+        page = []
+        last_key = None
+        more = False
+        index = start
+        while 0 <= index < len(keys):
+            key = keys[index]
+            index += step
+            summary = self._summaries[key[1]]
+            if name and name not in summary["name"].casefold():
+                continue
+            if len(page) == limit:
+                more = True
+                break
+            page.append(summary)
+            last_key = key
+
+        next_cursor = encode_cursor(sort, order, last_key) if more else None
+        total = len(keys) if not name else None
+        return page, next_cursor, total
+
+    def load(self, file_path):
+        if not os.path.exists(file_path):
+            return 0
+        with open(file_path, encoding="utf-8") as f:
+            state = json.load(f)
+        for chatbot_id, entry in state.items():
+            self.add(chatbot_id, entry["config"], document_name=entry["document_name"])
+        self.dirty = False
+        return len(state)
+
+    def save(self, file_path):
+        if not self.dirty:
+            return
+        directory = os.path.dirname(file_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        state = {
+            chatbot_id: {"config": config, "document_name": self._summaries[chatbot_id]["document_name"]}
+            for chatbot_id, config in self._configs.items()
+        }
+        # Escritura atómica para no dejar el archivo a medias
+        temporary = f"{file_path}.tmp"
+        with open(temporary, "w", encoding="utf-8") as f:
+            json.dump(state, f, ensure_ascii=False)
+        os.replace(temporary, file_path)
+        self.dirty = False
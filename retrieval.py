@@ -0,0 +1,163 @@
+# retrieval.py
+# Recuperación léxica (BM25) sobre los chunks de un documento. El índice
+# invertido se construye una vez por documento y guarda las listas de
+# aparición de todos los términos en dos arrays planos (chunks y frecuencias).
+# Un lote de preguntas se puntúa con vectores densos por término (un peso por
+# chunk) que se expanden una sola vez por lote y se suman en C (map/zip/sum);
+# las preguntas con los mismos términos comparten resultado.
+import heapq
+import math
+from bisect import bisect_left
+import re
+import sys
+from array import array
+from collections import Counter
+
+K1 = 1.2
+B = 0.75
+DENSE_BUDGET_BYTES = 32 * 1024 * 1024  # memoria máxima de vectores densos por lote
+
+_WORD_RE = re.compile(r"\w+")
+_ACCENTS = str.maketrans("áàäâãéèëêíìïîóòöôõúùüûñç", "aaaaaeeeeiiiiooooouuuunc")
+
+STOPWORDS = frozenset(
+    "a al algo como con cual cuales cuando cuanto cuanta cuantos cuantas de del donde el ella en es esta este "
+    "hay la las le lo los me mi no o para pero por que quien se ser si sin sobre son su sus te tiene un una "
+    "uno y ya yo an and are as at be by can do does for from how i in is it of on or the to what when where "
+    "which who why with you".split()
+)
+
+
+def tokenize(text):
+    # Minúsculas, sin acentos y sin palabras vacías
+    words = _WORD_RE.findall(text.casefold().translate(_ACCENTS))
+    return [word for word in words if word not in STOPWORDS and len(word) > 1]
+
+
+class LexicalIndex:
+    __slots__ = ("terms", "offsets", "chunks", "frequencies", "lengths", "average_length", "_norms")
+
+    def __init__(self, terms, offsets, chunks, frequencies, lengths):
+        # Listas de aparición planas: las del término t ocupan
+        # chunks[offsets[terms[t]]:offsets[terms[t] + 1]], ordenadas por chunk
+        self.terms = terms              # término -> número de término
+        self.offsets = offsets          # array('I'), un inicio por término más el final
+        self.chunks = chunks            # array('I') con los chunks de cada aparición
+        self.frequencies = frequencies  # array('H') con la frecuencia de cada aparición
+        self.lengths = lengths          # array('I') con el número de términos de cada chunk
+        self.average_length = (sum(lengths) / len(lengths)) if lengths else 0.0
+        # Término de BM25 que solo depende de la longitud del chunk
+        average = self.average_length or 1.0
+        self._norms = array("d", (K1 * (1 - B + B * length / average) for length in lengths))
+
+    @classmethod
+    def build(cls, store):
+        counts_by_chunk = []
+        lengths = array("I")
+        document_frequency = Counter()
+        for index in range(len(store)):
+            # Sin el prefijo común (cabecera de CSV): aparece en todos los chunks
+            text = str(store.view(index), "utf-8")
+            section = store.section(index)
+            if section:
+                text = f"{section} {text}"
+            counts = Counter(tokenize(text))
+            lengths.append(sum(counts.values()))
+            document_frequency.update(counts.keys())
+            counts_by_chunk.append(counts)
+
+        # Reservar el hueco de cada término y rellenarlo recorriendo los chunks en orden
+        terms = {}
+        offsets = array("I", [0])
+        for term, frequency in document_frequency.items():
+            # Internados: el vocabulario se comparte entre documentos
+            terms[sys.intern(term)] = len(terms)
+            offsets.append(offsets[-1] + frequency)
+        chunks = array("I", bytes(4 * offsets[-1]))
+        frequencies = array("H", bytes(2 * offsets[-1]))
+        cursor = array("I", offsets[:-1])
+        for index, counts in enumerate(counts_by_chunk):
+            for term, count in counts.items():
+                number = terms[term]
+                position = cursor[number]
+                chunks[position] = index
+                frequencies[position] = min(count, 0xFFFF)
+                cursor[number] = position + 1
+        return cls(terms, offsets, chunks, frequencies, lengths)
+
+    def __len__(self):
+        return len(self.lengths)
+
+    def __contains__(self, term):
+        return term in self.terms
+
+    def _span(self, term):
+        number = self.terms[term]
+        return self.offsets[number], self.offsets[number + 1]
+
+    def idf(self, term):
+        # Los términos que no aparecen en el documento reciben el IDF máximo
+        number = self.terms.get(term)
+        frequency = self.offsets[number + 1] - self.offsets[number] if number is not None else 0
+        return math.log(1 + (len(self.lengths) - frequency + 0.5) / (frequency + 0.5))
+
+    def _dense(self, term):
+        # Peso BM25 del término en todos los chunks (0.0 donde no aparece)
+        vector = array("d", bytes(8 * len(self.lengths)))
+        first, last = self._span(term)
+        scale = self.idf(term) * (K1 + 1)
+        norms = self._norms
+        for chunk, frequency in zip(self.chunks[first:last], self.frequencies[first:last]):
+            vector[chunk] = scale * frequency / (frequency + norms[chunk])
+        return vector
+
+    def search_many(self, questions, limit=3):
+        # Devuelve, para cada pregunta, los índices de sus mejores chunks
+        total = len(self.lengths)
+        max_vectors = max(1, DENSE_BUDGET_BYTES // (8 * total)) if total else 1
+        vectors = {}
+        results = {}
+        ranked = []
+        for question in questions:
+            terms = frozenset(term for term in tokenize(question) if term in self.terms)
+            hits = results.get(terms)
+            if hits is None:
+                hits = []
+                if terms:
+                    if len(vectors) + len(terms) > max_vectors:
+                        vectors.clear()
+                    term_vectors = []
+                    for term in terms:
+                        vector = vectors.get(term)
+                        if vector is None:
+                            vector = vectors[term] = self._dense(term)
+                        term_vectors.append(vector)
+                    scores = term_vectors[0] if len(term_vectors) == 1 else list(map(sum, zip(*term_vectors)))
+                    # nlargest es estable: a igualdad de puntuación, el chunk que aparece antes
+                    hits = [chunk for chunk in heapq.nlargest(limit, range(total), key=scores.__getitem__)
+                            if scores[chunk] > 0.0]
+                results[terms] = hits
+            ranked.append(list(hits))
+        return ranked
+
+    def search(self, question, limit=3):
+        return self.search_many([question], limit)[0]
+
+    def coverage(self, question, chunk_ids):
+        # Parte del IDF de la pregunta (términos del documento) presente en
+        # alguno de los chunks; None si la pregunta no tiene términos del documento
+        total = covered = 0.0
+        for term in set(tokenize(question)):
+            if term not in self.terms:
+                continue
+            weight = self.idf(term)
+            total += weight
+            # Las listas de chunks están ordenadas: búsqueda binaria
+            first, last = self._span(term)
+            chunks = self.chunks
+            for chunk in chunk_ids:
+                position = bisect_left(chunks, chunk, first, last)
+                if position < last and chunks[position] == chunk:
+                    covered += weight
+                    break
+        return covered / total if total else None
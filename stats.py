@@ -0,0 +1,11 @@
+# stats.py
+# Percentil por rango más cercano, compartido por /api/ask-batch/ y los benchmarks
+import math
+
+
+def percentile(sorted_values, fraction):
+    # Sobre una lista ya ordenada: el menor valor que deja por debajo (o igual)
+    # al menos `fraction` de las muestras
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values), max(1, math.ceil(fraction * len(sorted_values)))) - 1]
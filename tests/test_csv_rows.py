@@ -0,0 +1,14 @@
+# tests/test_csv_rows.py
+from extractors.csv_rows import chunk_csv, iter_csv_rows
+
+
+def test_excel_bom_is_not_part_of_the_first_header(tmp_path):
+    file_path = tmp_path / "productos.csv"
+    file_path.write_bytes("\ufeffProducto;Precio\nAlfa;10\nBeta;20\n".encode("utf-8"))
+
+    rows = list(iter_csv_rows(str(file_path)))
+    assert rows[0] == ["Producto", "Precio"]
+
+    table = chunk_csv(str(file_path))
+    assert table.header == ["Producto", "Precio"]
+    assert table.index.lookup("precio del producto alfa") == [0]
@@ -0,0 +1,41 @@
+# tests/test_extractive.py
+from extractive import extract_answer
+
+FAQ = (
+    "Preguntas frecuentes\n"
+    "¿Cuál es el horario de atención? El horario de atención es de lunes a viernes de 9:00 a 18:00.\n"
+    "¿Cuánto tarda el envío? El envío tarda de 2 a 5 días laborables.\n"
+    "Cuál es el horario de atención\n"
+)
+
+
+def test_faq_question_is_not_returned_as_answer():
+    sentence, confidence = extract_answer("¿Cuál es el horario de atención?", [FAQ], lambda term: 1.0)
+    assert sentence == "El horario de atención es de lunes a viernes de 9:00 a 18:00."
+    assert confidence == 1.0
+
+
+def test_no_answer_when_only_the_question_matches():
+    chunk = "¿Aceptan pagos con tarjeta?\nConsulte las condiciones en la oficina."
+    sentence, confidence = extract_answer("¿Aceptan pagos con tarjeta?", [chunk], lambda term: 1.0)
+    assert confidence < 1.0
+    assert sentence != "¿Aceptan pagos con tarjeta?"
+
+
+def test_decimal_and_thousands_separators_do_not_split_sentences():
+    chunk = "El precio del producto Beta es 9.99 euros por unidad. Plan mensual: 1.500 euros."
+    sentence, _ = extract_answer("¿Cuál es el precio del producto Beta?", [chunk], lambda term: 1.0)
+    assert sentence == "El precio del producto Beta es 9.99 euros por unidad."
+    sentence, _ = extract_answer("¿Cuánto cuesta el plan mensual?", [chunk], lambda term: 1.0)
+    assert sentence == "Plan mensual: 1.500 euros."
+
+
+def test_sentence_repeating_the_question_terms_is_an_answer():
+    chunk = "El envío es gratuito. Los pedidos llegan en dos días y el envío urgente cuesta extra."
+    sentence, confidence = extract_answer("¿El envío es gratuito?", [chunk], lambda term: 1.0)
+    assert sentence == "El envío es gratuito."
+    assert confidence == 1.0
+    chunk = "Precios\nEl plan mensual cuesta 9.99 euros."
+    sentence, confidence = extract_answer("¿Cuánto cuesta el plan mensual?", [chunk], lambda term: 1.0)
+    assert sentence == "El plan mensual cuesta 9.99 euros."
+    assert confidence == 1.0
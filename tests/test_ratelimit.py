@@ -0,0 +1,73 @@
+# tests/test_ratelimit.py
+import json
+
+import pytest
+
+import ratelimit
+from ratelimit import LimitExceeded, RateLimiter
+
+
+def test_batch_cost_is_granted_partially():
+    limiter = RateLimiter({"chatbot": 5})
+    assert limiter.check("bot", cost=3) == 3
+    assert limiter.check("bot", cost=3) == 2
+    with pytest.raises(LimitExceeded) as error:
+        limiter.check("bot", cost=3)
+    assert error.value.scope == "chatbot"
+    assert limiter.usage("bot")["requests_today"] == 5
+
+
+def test_no_bucket_is_consumed_when_another_one_rejects():
+    limiter = RateLimiter({"chatbot": 10, "ip": 1})
+    limiter.check("bot", ip="1.2.3.4")
+    with pytest.raises(LimitExceeded) as error:
+        limiter.check("bot", ip="1.2.3.4")
+    assert error.value.scope == "ip"
+    assert limiter.buckets[("chatbot", "bot")].tokens == pytest.approx(9.0, abs=0.01)
+
+
+def test_counters_for_today_reset_when_the_day_changes():
+    limiter = RateLimiter({}, daily_token_quota=100)
+    limiter.check("bot")
+    limiter.record_usage("bot", {"total_tokens": 100})
+    with pytest.raises(LimitExceeded):
+        limiter.check_quota("bot")
+
+    limiter.day = "2000-01-01"
+    limiter.check_quota("bot")
+    usage = limiter.usage("bot")
+    assert usage["tokens_used"] == 0
+    assert usage["requests_today"] == 0
+    assert usage["requests_total"] == 1
+
+
+def test_load_restores_counters_and_retain_drops_unknown_keys(tmp_path):
+    state_file = tmp_path / "usage.json"
+    limiter = RateLimiter({}, state_file=str(state_file))
+    for key in ("bot", "doc:1", "deleted"):
+        limiter.check(key)
+        limiter.record_usage(key, {"total_tokens": 7})
+    limiter.save()
+
+    restored = RateLimiter({}, state_file=str(state_file))
+    restored.load()
+    assert restored.usage("bot") == limiter.usage("bot")
+    restored.retain(lambda key: key != "deleted")
+    assert restored.usage("deleted")["requests_total"] == 0
+    assert restored.usage("doc:1")["tokens_used"] == 7
+    restored.save()
+    assert "deleted" not in json.loads(state_file.read_text())["requests_total"]
+
+
+def test_tokens_from_a_previous_day_are_not_loaded(tmp_path):
+    state_file = tmp_path / "usage.json"
+    state_file.write_text(json.dumps({
+        "day": "2000-01-01",
+        "tokens_used": {"bot": 50},
+        "requests_today": {"bot": 2},
+        "requests_total": {"bot": 9}
+    }))
+    limiter = RateLimiter({}, state_file=str(state_file))
+    limiter.load()
+    assert limiter.usage("bot") == {"day": ratelimit.date.today().isoformat(), "tokens_used": 0,
+                                    "requests_today": 0, "requests_total": 9}
@@ -0,0 +1,32 @@
+# tests/test_sections.py
+from extractors.sections import chunk_blocks, iter_blocks
+
+
+def chunk_text(text, markdown=False, chunk_size=1000):
+    return chunk_blocks(iter_blocks(text.splitlines(True), markdown=markdown), chunk_size)
+
+
+def test_label_and_value_lines_stay_in_one_chunk():
+    chunks, sections = chunk_text("Horario de atención\n\nLunes a viernes de 9 a 18\n\nTeléfono\n\n900 123 456\n")
+    assert chunks == ["Horario de atención\n\nLunes a viernes de 9 a 18\n\nTeléfono\n\n900 123 456"]
+    assert sections == [""]
+
+
+def test_plain_heading_needs_a_longer_paragraph_below():
+    text = "Envíos\n\nLos pedidos se entregan en un plazo de dos a cinco días laborables.\n"
+    blocks = list(iter_blocks(text.splitlines(True), markdown=False))
+    assert blocks[0] == ("plain_heading", "Envíos", 2)
+    chunks, sections = chunk_text(text)
+    assert chunks == ["Envíos\n\nLos pedidos se entregan en un plazo de dos a cinco días laborables."]
+    assert sections == ["Envíos"]
+
+
+def test_small_sections_are_packed_with_their_titles():
+    text = "# Guía\n\n## Horario\n\nDe 9 a 18.\n\n## Contacto\n\nEscriba a soporte.\n"
+    chunks, sections = chunk_text(text, markdown=True)
+    assert chunks == ["Guía\n\nHorario\n\nDe 9 a 18.\n\nContacto\n\nEscriba a soporte."]
+    assert sections == ["Guía"]
+
+    chunks, sections = chunk_text(text, markdown=True, chunk_size=30)
+    assert chunks == ["Guía\n\nHorario\n\nDe 9 a 18.", "Escriba a soporte."]
+    assert sections == ["Guía", "Guía > Contacto"]
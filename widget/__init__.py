@@ -0,0 +1,3 @@
+# widget/__init__.py
+# Widget incrustable: fuentes (widget.js, widget.css) y el paso de build que
+# genera el bundle minificado con hash de contenido.
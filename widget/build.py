@@ -0,0 +1,97 @@
+# widget/build.py
+# Build del widget: une widget.css dentro de widget.js, minifica ambos, nombra
+# el resultado con el hash de su contenido (widget.<hash>.js), lo guarda junto
+# a una copia gzip y escribe un manifest.json con el nombre actual. Como el
+# nombre cambia con el contenido, el bundle se puede servir como "immutable".
+#
+#     python -m widget.build [--out static/widget]
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import re
+
+SOURCE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_OUT_DIR = os.path.join("static", "widget")
+MANIFEST = "manifest.json"
+
+_CSS_COMMENT_RE = re.compile(r"/\*.*?\*/", re.DOTALL)
+_CSS_SPACE_RE = re.compile(r"\s+")
+_CSS_PUNCTUATION_RE = re.compile(r"\s*([{};:,>])\s*")
+
+# Tokens de JS que hay que respetar al minificar: cadenas, plantillas y comentarios
+# (el widget no usa expresiones regulares literales)
+_JS_TOKEN_RE = re.compile(
+    r"(?P<string>'(?:\\.|[^'\\\n])*'|\"(?:\\.|[^\"\\\n])*\"|`(?:\\.|[^`\\])*`)"
+    r"|(?P<comment>//[^\n]*|/\*.*?\*/)"
+    r"|(?P<space>\s+)"
+    r"|(?P<code>[^'\"`/\s]+|/)",
+    re.DOTALL
+)
+_WORD_CHAR_RE = re.compile(r"[\w$]")
+
+
+def minify_css(css):
+    css = _CSS_COMMENT_RE.sub("", css)
+    css = _CSS_SPACE_RE.sub(" ", css)
+    css = _CSS_PUNCTUATION_RE.sub(r"\1", css)
+    return css.replace(";}", "}").strip()
+
+
+def minify_js(source):
+    # Quita comentarios y espacios; solo deja un espacio entre dos caracteres de
+    # palabra. El código del widget termina todas las sentencias con ";"
+    parts = []
+    pending_space = False
+    for match in _JS_TOKEN_RE.finditer(source):
+        kind = match.lastgroup
+        if kind in ("comment", "space"):
+            pending_space = True
+            continue
+        token = match.group()
+        if pending_space and parts and _WORD_CHAR_RE.match(parts[-1][-1]) and _WORD_CHAR_RE.match(token[0]):
+            parts.append(" ")
+        parts.append(token)
+        pending_space = False
+    return "".join(parts)
+
+
+def bundle(source_dir=SOURCE_DIR):
+    with open(os.path.join(source_dir, "widget.css"), encoding="utf-8") as f:
+        css = minify_css(f.read())
+    with open(os.path.join(source_dir, "widget.js"), encoding="utf-8") as f:
+        js = f.read()
+    return minify_js(js.replace("__WIDGET_CSS__", json.dumps(css, ensure_ascii=False)))
+
+
+def build(out_dir=DEFAULT_OUT_DIR, source_dir=SOURCE_DIR):
+    # Devuelve el manifest: {"widget.js": "widget.<hash>.js"}
+    content = bundle(source_dir).encode("utf-8")
+    name = f"widget.{hashlib.sha256(content).hexdigest()[:12]}.js"
+    os.makedirs(out_dir, exist_ok=True)
+    with open(os.path.join(out_dir, name), "wb") as f:
+        f.write(content)
+    with gzip.open(os.path.join(out_dir, f"{name}.gz"), "wb", compresslevel=9) as f:
+        f.write(content)
+
+    manifest = {"widget.js": name}
+    temporary = os.path.join(out_dir, f"{MANIFEST}.tmp")
+    with open(temporary, "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+    os.replace(temporary, os.path.join(out_dir, MANIFEST))
+    return manifest
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build del bundle del widget")
+    parser.add_argument("--out", default=DEFAULT_OUT_DIR)
+    options = parser.parse_args(argv)
+    manifest = build(options.out)
+    size = os.path.getsize(os.path.join(options.out, manifest["widget.js"]))
+    compressed = os.path.getsize(os.path.join(options.out, manifest["widget.js"] + ".gz"))
+    print(f"{manifest['widget.js']}: {size} bytes ({compressed} con gzip)")
+
+
+if __name__ == "__main__":
+    main()
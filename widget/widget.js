@@ -0,0 +1,194 @@
+// widget/widget.js - DocumentChat Widget v2
+// Código común a todos los chatbots. Cada script de arranque por chatbot
+// (/api/widget/{id}.js) añade su configuración a window.DocumentChat y este
+// bundle monta un widget por configuración. Todas las búsquedas de elementos
+// se hacen dentro del contenedor de cada widget, así que varios widgets
+// pueden convivir en la misma página.
+(function() {
+    const CSS = __WIDGET_CSS__;
+    const CHAT_ICON = '<svg width="24" height="24" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2" stroke-linecap="round" stroke-linejoin="round"><path d="M21 15a2 2 0 0 1-2 2H7l-4 4V5a2 2 0 0 1 2-2h14a2 2 0 0 1 2 2z"></path></svg>';
+    const SEND_ICON = '<svg width="16" height="16" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2" stroke-linecap="round" stroke-linejoin="round"><line x1="22" y1="2" x2="11" y2="13"></line><polygon points="22 2 15 22 11 13 2 9 22 2"></polygon></svg>';
+    let mounted = 0;
+
+    // Estilos una sola vez por página
+    function injectStyles() {
+        if (document.getElementById('dc-widget-styles')) {
+            return;
+        }
+        const style = document.createElement('style');
+        style.id = 'dc-widget-styles';
+        style.textContent = CSS;
+        document.head.appendChild(style);
+    }
+
+    function element(tag, className, html) {
+        const node = document.createElement(tag);
+        node.className = className;
+        if (html) {
+            node.innerHTML = html;
+        }
+        return node;
+    }
+
+    function mount(config) {
+        // El script puede ejecutarse antes de que exista <body>
+        if (!document.body) {
+            document.addEventListener('DOMContentLoaded', () => mount(config));
+            return;
+        }
+        injectStyles();
+        const offset = 20 + mounted * 80;
+        mounted += 1;
+
+        // Crear el HTML del widget
+        const container = element('div', 'dc-widget-container');
+        container.style.setProperty('--dc-primary', config.primaryColor);
+        container.style.right = offset + 'px';
+
+        const chatButton = element('div', 'dc-chat-button', CHAT_ICON);
+        container.appendChild(chatButton);
+
+        const chatWindow = element('div', 'dc-chat-window');
+        chatWindow.style.right = offset + 'px';
+
+        const chatHeader = element('div', 'dc-chat-header', '<div>DocumentChat</div><div class="dc-chat-close">✕</div>');
+        chatWindow.appendChild(chatHeader);
+
+        const messagesContainer = element('div', 'dc-chat-messages');
+        chatWindow.appendChild(messagesContainer);
+
+        const inputContainer = element('div', 'dc-chat-input-container');
+        const chatInput = element('input', 'dc-chat-input');
+        chatInput.type = 'text';
+        chatInput.placeholder = config.placeholderText;
+        const sendButton = element('button', 'dc-send-button', SEND_ICON);
+        sendButton.disabled = true;
+        inputContainer.appendChild(chatInput);
+        inputContainer.appendChild(sendButton);
+        chatWindow.appendChild(inputContainer);
+
+        container.appendChild(chatWindow);
+        document.body.appendChild(container);
+
+        const closeButton = container.querySelector('.dc-chat-close');
+        let loadingDiv = null;
+        let chatHistory = [];
+        // Identifica la conversación para reutilizar el contexto entre turnos
+        const sessionId = (window.crypto && crypto.randomUUID) ? crypto.randomUUID() : Date.now().toString(36) + Math.random().toString(36).slice(2);
+
+        // Añadir un mensaje al chat
+        function addMessage(content, isUser) {
+            const messageDiv = element('div', isUser ? 'dc-message dc-user-message' : 'dc-message dc-bot-message');
+            messageDiv.textContent = content;
+            messagesContainer.appendChild(messageDiv);
+            messagesContainer.scrollTop = messagesContainer.scrollHeight;
+        }
+
+        // Mostrar y ocultar el mensaje de carga
+        function showLoading() {
+            loadingDiv = element('div', 'dc-message dc-bot-message dc-loading',
+                '<div class="dc-loading-dots"><span></span><span></span><span></span></div>');
+            messagesContainer.appendChild(loadingDiv);
+            messagesContainer.scrollTop = messagesContainer.scrollHeight;
+        }
+
+        function hideLoading() {
+            if (loadingDiv) {
+                loadingDiv.remove();
+                loadingDiv = null;
+            }
+        }
+
+        // Enviar pregunta al servidor
+        async function sendQuestion(question) {
+            try {
+                showLoading();
+
+                const response = await fetch(config.apiBase + '/api/ask-question/', {
+                    method: 'POST',
+                    headers: {
+                        'Content-Type': 'application/json',
+                    },
+                    body: JSON.stringify({
+                        question: question,
+                        document_id: config.documentId,
+                        chatbot_id: config.chatbotId,
+                        session_id: sessionId,
+                        chat_history: chatHistory
+                    })
+                });
+
+                hideLoading();
+
+                if (response.ok) {
+                    const data = await response.json();
+                    addMessage(data.answer, false);
+
+                    // Añadir a historial y mantenerlo manejable
+                    chatHistory.push({
+                        question: question,
+                        answer: data.answer
+                    });
+                    if (chatHistory.length > 10) {
+                        chatHistory.shift();
+                    }
+                } else {
+                    const error = await response.json();
+                    addMessage('Lo siento, hubo un problema al procesar tu pregunta.', false);
+                    console.error('Error:', error);
+                }
+            } catch (error) {
+                hideLoading();
+                addMessage('Lo siento, no pude conectarme con el servidor. Por favor intenta de nuevo más tarde.', false);
+                console.error('Error:', error);
+            }
+        }
+
+        function submit() {
+            const question = chatInput.value.trim();
+            if (question !== '') {
+                addMessage(question, true);
+                chatInput.value = '';
+                sendButton.disabled = true;
+                sendQuestion(question);
+            }
+        }
+
+        // Event listeners
+        chatButton.addEventListener('click', () => {
+            chatWindow.style.display = 'flex';
+            chatButton.style.display = 'none';
+
+            // Si no hay mensajes, añadir mensaje de bienvenida
+            if (messagesContainer.children.length === 0) {
+                addMessage(config.welcomeMessage, false);
+            }
+
+            chatInput.focus();
+        });
+
+        closeButton.addEventListener('click', () => {
+            chatWindow.style.display = 'none';
+            chatButton.style.display = 'flex';
+        });
+
+        chatInput.addEventListener('input', () => {
+            sendButton.disabled = chatInput.value.trim() === '';
+        });
+
+        chatInput.addEventListener('keypress', (e) => {
+            if (e.key === 'Enter') {
+                submit();
+            }
+        });
+
+        sendButton.addEventListener('click', submit);
+    }
+
+    // Montar las configuraciones que llegaron antes que el bundle y las siguientes
+    const queue = window.DocumentChat;
+    window.DocumentChat = { push: mount };
+    if (Array.isArray(queue)) {
+        queue.forEach(mount);
+    }
+})();